@@ -0,0 +1,67 @@
+"""
+Compare regex matching engines used by `bdb-apply`.
+
+Builds a synthetic regex file with `regexify_keywords_to_file` (from random terms,
+including slop between words) and synthetic documents, then reports the time taken
+by each engine in `bratdb.funcs.matchers` (with and without the keyword prefilter),
+verifying they produce the same matches.
+
+    python benchmarks/bench_apply.py [--regexes 4000] [--documents 50]
+"""
+import argparse
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from bratdb.funcs.apply import compile_regexes, apply_regexes_to_text
+from bratdb.funcs.matchers import get_matcher
+from bratdb.funcs.regexify import regexify_keywords_to_file
+
+
+def make_words(n, rng):
+    return [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(n)]
+
+
+def make_extract_file(path, vocab, n_regexes, rng):
+    lines = []
+    for i in range(n_regexes):
+        words = rng.sample(vocab, rng.randint(1, 3))
+        if len(words) > 1 and rng.random() < 0.3:
+            words.insert(1, f'[W{rng.randint(1, 3)}<|{rng.choice([",", ".", ""])}|>]')
+        lines.append(f'concept{i % 50}\t{" ".join(w for w in words if w[0] != "[")}\t{" ".join(words)}')
+    path.write_text('\n'.join(lines), encoding='utf8')
+
+
+def make_document(vocab, n_words, rng):
+    return ' '.join(rng.choice(vocab) + rng.choice(['', '', '', ',', '.']) for _ in range(n_words))
+
+
+def main(n_regexes=4000, n_documents=50, n_words=500, seed=0):
+    rng = random.Random(seed)
+    vocab = make_words(20000, rng)
+    documents = [make_document(vocab, n_words, rng) for _ in range(n_documents)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        extract = Path(tmpdir) / 'terms.extract.tsv'
+        make_extract_file(extract, vocab, n_regexes, rng)
+        regexify_keywords_to_file(str(extract), outpath=tmpdir)
+        regexes, literals = compile_regexes(str(next(Path(tmpdir).glob('*.regexify.tsv'))), with_literals=True)
+    print(f'Regexes: {len(regexes)}; documents: {n_documents} ({n_words} words each)')
+    results = {}
+    for engine, prefilter in [('loop', False), ('fused', False), ('loop', True), ('fused', True)]:
+        label = f'{engine}{" + prefilter" if prefilter else ""}'
+        start = time.perf_counter()
+        matcher = get_matcher(regexes, engine, literals if prefilter else None)
+        results[label] = [list(apply_regexes_to_text(matcher, doc)) for doc in documents]
+        print(f'{label}: {time.perf_counter() - start:.3f}s')
+    print(f'Matches: {sum(len(r) for r in results["loop"])}')
+    print(f'Identical: {all(result == results["loop"] for result in results.values())}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--regexes', default=4000, type=int, dest='n_regexes')
+    parser.add_argument('--documents', default=50, type=int, dest='n_documents')
+    parser.add_argument('--words', default=500, type=int, dest='n_words')
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""
+Measure memory used by parsed brat documents.
+
+Builds synthetic annotation/text files and reports, per document, the memory
+allocated by `create_annotations` (via tracemalloc) and the size of its pickle.
+
+    python benchmarks/bench_memory.py [--documents 200] [--sentences 40]
+"""
+import argparse
+import gc
+import pickle
+import random
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from bratdb.reader import create_annotations
+
+WORDS = ('patient reports feeling depressed and anxious with no chest pain or shortness of breath'
+         ' follow up in two weeks sooner if symptoms worsen denies suicidal ideation').split()
+LABELS = ('Symptom', 'Medication', 'Diagnosis')
+
+
+def make_document(n_sentences, rng):
+    sents = []
+    for _ in range(n_sentences):
+        words = rng.choices(WORDS, k=rng.randint(5, 20))
+        sents.append(' '.join(words).capitalize() + '.')
+    text = ' '.join(sents) + '\n'
+    annots = []
+    for i in range(n_sentences // 2):
+        start = rng.randrange(0, len(text) - 30)
+        start = text.rindex(' ', 0, start) + 1 if ' ' in text[:start] else 0
+        end = text.index(' ', start + 3)
+        annots.append(f'T{i + 1}\t{rng.choice(LABELS)} {start} {end}\t{text[start:end]}')
+        if i % 3 == 0:
+            annots.append(f'A{i + 1}\tNegated T{i + 1}')
+    return text, '\n'.join(annots) + '\n'
+
+
+def main(n_documents=200, n_sentences=40, seed=0):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for i in range(n_documents):
+            text, ann = make_document(n_sentences, rng)
+            txt_path, ann_path = Path(tmpdir) / f'{i}.txt', Path(tmpdir) / f'{i}.ann'
+            txt_path.write_text(text, encoding='utf8')
+            ann_path.write_text(ann, encoding='utf8')
+            paths.append((ann_path, txt_path))
+        gc.collect()
+        tracemalloc.start()
+        results = [create_annotations(ann_path, txt_path) for ann_path, txt_path in paths]
+        gc.collect()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        pickled = len(pickle.dumps(results))
+    print(f'Documents: {n_documents} ({n_sentences} sentences each)')
+    print(f'Memory per document: {memory / n_documents / 1024:.1f} KiB')
+    print(f'Pickle per document: {pickled / n_documents / 1024:.1f} KiB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--documents', default=200, type=int, dest='n_documents')
+    parser.add_argument('--sentences', default=40, type=int, dest='n_sentences')
+    main(**vars(parser.parse_args()))
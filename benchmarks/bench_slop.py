@@ -0,0 +1,71 @@
+"""
+Compare slop patterns generated by `regexify_keywords_to_file` with the previous
+(ambiguous) form, `\\W*(\\w+\\W*){0,n}`.
+
+Builds regexes for synthetic terms with slop between words, and a synthetic corpus
+of long, unpunctuated notes in which the first word of each term is common, but
+the term is rarely complete (a near miss, which causes backtracking). Reports the
+time taken to apply each set of regexes, verifying they produce the same matches.
+
+    python benchmarks/bench_slop.py [--terms 200] [--documents 20]
+"""
+import argparse
+import random
+import re
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from bratdb.funcs.apply import compile_regexes, apply_regexes_to_text
+from bratdb.funcs.regexify import regexify_keywords_to_file, get_slop_pattern
+
+
+def make_words(n, rng):
+    return [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 15))) for _ in range(n)]
+
+
+def to_legacy(pattern, sep_count):
+    """Replace slop patterns with the previous form"""
+    for sep, count in sep_count:
+        pattern = pattern.replace(get_slop_pattern(count, sep), rf'{sep}*(\w+{sep}*){{0,{count}}}')
+    return pattern
+
+
+def main(n_terms=200, n_documents=20, n_words=2000, slop=3, seed=0):
+    rng = random.Random(seed)
+    firsts = make_words(20, rng)
+    vocab = make_words(5000, rng)
+    lines = []
+    for i in range(n_terms):
+        first, second = rng.choice(firsts), rng.choice(vocab)
+        punct = rng.choice(['', ','])
+        lines.append(f'concept{i}\t{first} {second}\t{first} [W{slop}<|{punct}|>] {second}')
+    documents = [' '.join(rng.choice(firsts) if rng.random() < 0.2 else rng.choice(vocab)
+                          for _ in range(n_words)) for _ in range(n_documents)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        extract = Path(tmpdir) / 'terms.extract.tsv'
+        extract.write_text('\n'.join(lines), encoding='utf8')
+        regexify_keywords_to_file(str(extract), outpath=tmpdir)
+        regexes = compile_regexes(str(next(Path(tmpdir).glob('*.regexify.tsv'))))
+    sep_count = [(r'\W', slop + 1), (r'[^\w\.;]', slop + 1)]  # includes `extra_slop`
+    legacy = [(concept, term, re.compile(to_legacy(regex.pattern, sep_count), regex.flags))
+              for concept, term, regex in regexes]
+    assert all(new.pattern != old.pattern for (_, _, new), (_, _, old) in zip(regexes, legacy))
+    print(f'Regexes: {len(regexes)}; documents: {n_documents} ({n_words} words each)')
+    results = {}
+    for label, rxs in [('legacy', legacy), ('nested', regexes)]:
+        start = time.perf_counter()
+        results[label] = [list(apply_regexes_to_text(rxs, doc)) for doc in documents]
+        print(f'{label}: {time.perf_counter() - start:.3f}s')
+    print(f'Matches: {sum(len(r) for r in results["nested"])}')
+    print(f'Identical: {results["legacy"] == results["nested"]}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--terms', default=200, type=int, dest='n_terms')
+    parser.add_argument('--documents', default=20, type=int, dest='n_documents')
+    parser.add_argument('--words', default=2000, type=int, dest='n_words')
+    parser.add_argument('--slop', default=3, type=int)
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,43 @@
+"""
+Compare the sentence splitters in `bratdb.nlp.sspl`.
+
+Builds a synthetic document of clinical-style sentences (with abbreviations,
+coordinations, and parentheticals which trigger the GeniaSS refinement rules)
+and reports the time taken by each splitter, verifying they agree.
+
+    python benchmarks/bench_sspl.py [--sentences 20000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+from bratdb.nlp.sspl import sentencebreaks_to_list, SPLITTERS
+
+FRAGMENTS = ('The patient was seen.', 'He denies pain.', 'She reports nausea.', 'S. aureus grew',
+             'seen by Anton P. Chekhov', 'e.g. this', 'i.e. thus', 'vs. placebo', 'Dr. Who', 'Fig. 3 shows',
+             'approx. 10 mg', 'and then', 'or not', 'in the', 'with', 'the dose (10 mg) was', '(see Table 2)',
+             'Smith, A., Black, B.,', 'is good.', 'Follow up in 2 weeks.')
+SEPARATORS = (' ', ' ', '\n', '. ', '.\n', '? ')
+
+
+def make_text(n_sentences, rng):
+    return ''.join(rng.choice(FRAGMENTS) + rng.choice(SEPARATORS) for _ in range(n_sentences))
+
+
+def main(n_sentences=20000, repeat=3, seed=0):
+    text = make_text(n_sentences, random.Random(seed))
+    print(f'Characters: {len(text)}')
+    results = {}
+    for splitter in SPLITTERS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results[splitter] = sentencebreaks_to_list(text, splitter=splitter)
+        print(f'{splitter}: {(time.perf_counter() - start) / repeat:.3f}s')
+    print(f'Identical: {len(set(map(tuple, results.values()))) == 1}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sentences', default=20000, type=int, dest='n_sentences')
+    parser.add_argument('--repeat', default=3, type=int)
+    main(**vars(parser.parse_args()))
@@ -22,6 +22,7 @@ setup(name='bratdb',
                   'bdb-build = bratdb.scripts.build:main',
                   'bdb-freq = bratdb.scripts.freqs:main',
                   'bdb-info = bratdb.scripts.info:main',
+                  'bdb-export-dump = bratdb.scripts.export_dump:main',
                   'bdb-extract = bratdb.scripts.extract:main',
                   'bdb-merge = bratdb.scripts.merge:main',
                   'bdb-extract-build = bratdb.scripts.regexify:main',
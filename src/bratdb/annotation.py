@@ -2,17 +2,82 @@ from collections import defaultdict
 
 
 class Annotation(object):
+    __slots__ = ('key', 'labels', '_text', 'spans', '_links', '_attributes', '_words', '_source')
 
     def __init__(self, key, text, spans, labels=()):
         self.key = key
-        self.links = defaultdict(list)
-        self.labels = defaultdict(list)
-        self.attributes = {}
-        for label in labels:
-            self.labels[label] = []
+        self.labels = dict.fromkeys(labels, ())
         self.text = text
         self.spans = spans
-        self.words = []
+        # containers are only created when first needed
+        self._links = None
+        self._attributes = None
+        self._words = None
+        self._source = None  # document text, if `text` is read from it
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):  # (None, slots)
+            state = state[1]
+        else:  # written before `__slots__`
+            state = {
+                'key': state['key'],
+                'labels': dict.fromkeys(state['labels'], ()),
+                'text': state['text'],
+                'spans': state['spans'],
+                '_links': state['links'] or None,
+                '_attributes': state['attributes'] or None,
+                '_words': state['words'] or None,
+                '_source': None,
+            }
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    @property
+    def text(self):
+        if self._text is None and self._source is not None:
+            return ' '.join(self._source[start:end] for start, end in self.spans)
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+
+    def set_text_source(self, source, text):
+        """Read text from `source` (e.g., `StoredText` of document) rather than storing it
+
+        Only used if the annotation's text matches its spans in `text`.
+        :param source: replacement for document text
+        :param text: document text
+        """
+        if self._text == ' '.join(text[start:end] for start, end in self.spans):
+            self._text = None
+            self._source = source
+
+    @property
+    def links(self):
+        if self._links is None:
+            self._links = defaultdict(list)
+        return self._links
+
+    @property
+    def attributes(self):
+        if self._attributes is None:
+            self._attributes = {}
+        return self._attributes
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = []
+        elif not isinstance(self._words, list):  # document with deferred sentences
+            document, self._words = self._words, []
+            document.sentences  # adds words to this annotation (see `Document.add_annotations`)
+        return self._words
+
+    def defer_words(self, document):
+        """Find words in `document` when first accessed (i.e., when its sentences are split)"""
+        if self._words is None:
+            self._words = document
 
     @property
     def fullspan(self):
@@ -22,4 +87,4 @@ class Annotation(object):
         self.attributes[attribute] = target
 
     def __repr__(self):
-        return f'{self.key}{self.labels.keys()}:"{self.text[:20]}"'
\ No newline at end of file
+        return f'{self.key}{self.labels.keys()}:"{self.text[:20]}"'
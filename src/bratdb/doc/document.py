@@ -0,0 +1,134 @@
+from bisect import bisect_right
+
+from bratdb.doc.sentence import Sentence
+from bratdb.nlp.sspl import sentencebreaks_to_list
+
+
+class Document:
+    """
+    Sentences of a single document, indexed by character offset
+
+    Behaves as a list of `Sentence` objects. If created with `Document.from_text(..., defer=True)`,
+    the document only stores its text until sentences are first accessed.
+    """
+    __slots__ = ('text', 'word_pat', 'splitter', '_sentences', '_sent_starts', '_pending')
+
+    def __init__(self, sentences=None, *, text=None, word_pat=None, splitter='geniass'):
+        """
+
+        :param sentences: list of `Sentence`; if None, these will be created from `text`
+            when first accessed
+        :param text: document text
+        :param word_pat: regular expression identifying words (see `Sentence.WORD_PAT`)
+        :param splitter: sentence splitter (see `sspl.SPLITTERS`)
+        """
+        self.text = text
+        self.word_pat = word_pat
+        self.splitter = splitter
+        self._sentences = None
+        self._sent_starts = None
+        self._pending = None  # annotations to add to words once sentences are created
+        if sentences is not None:
+            self._set_sentences(sentences)
+
+    @classmethod
+    def from_text(cls, text, word_pat=None, defer=False, splitter='geniass', cache=None,
+                  keep_text=False):
+        """Split text into sentences
+
+        :param text: document text
+        :param word_pat: regular expression identifying words (see `Sentence.WORD_PAT`)
+        :param defer: if True, wait to split sentences until they (or the words of an
+            added annotation) are first accessed
+        :param splitter: sentence splitter (see `sspl.SPLITTERS`)
+        :param cache: `SentenceCache` to reuse sentence splits from (ignored if `defer`)
+        :param keep_text: if True, retain `text` even if sentences are split
+        """
+        if defer:
+            return cls(text=text, word_pat=word_pat, splitter=splitter)
+        return cls(split_sentences(text, word_pat=word_pat, splitter=splitter, cache=cache),
+                   text=text if keep_text else None)
+
+    def _set_sentences(self, sentences):
+        self._sentences = list(sentences)
+        self._sent_starts = [sent.start for sent in self._sentences]
+
+    def set_text_source(self, source):
+        """Replace document text (e.g., with its `StoredText`), which sentences will read from"""
+        if self._sentences is not None:
+            for sent in self._sentences:
+                sent.set_text_source(source)
+        self.text = source
+
+    @property
+    def is_split(self):
+        return self._sentences is not None
+
+    @property
+    def sentences(self):
+        if self._sentences is None:
+            self._set_sentences(split_sentences(str(self.text), word_pat=self.word_pat,
+                                                splitter=getattr(self, 'splitter', 'geniass')))
+            if not isinstance(self.text, str):  # e.g., `StoredText`: don't retain copies
+                for sent in self._sentences:
+                    sent.set_text_source(self.text)
+            if self._pending:
+                pending, self._pending = self._pending, None
+                self.add_annotations(pending)
+        return self._sentences
+
+    def add_annotations(self, annotations):
+        """Add annotations to the words they span
+
+        If sentences have not yet been split, this is deferred until they are, or until
+        the words of one of the annotations are accessed.
+        """
+        if self._sentences is None:
+            if self._pending is None:
+                self._pending = []
+            for ann in annotations:
+                ann.defer_words(self)
+                self._pending.append(ann)
+            return
+        for ann in annotations:
+            for start, end in ann.spans:
+                for word in self.words_in_span(start, end):
+                    ann.words.append(word)
+                    word.add_annotation(ann)
+
+    def __iter__(self):
+        return iter(self.sentences)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __getitem__(self, item):
+        return self.sentences[item]
+
+    def sentences_in_span(self, start, end):
+        """Iterate through sentences overlapping the character span [start, end)"""
+        sentences = self.sentences
+        idx = max(bisect_right(self._sent_starts, start) - 1, 0)
+        for sent in sentences[idx:]:
+            if sent.start >= end:
+                break
+            if sent.end > start:
+                yield sent
+
+    def words_in_span(self, start, end):
+        """Iterate through words overlapping the character span [start, end)"""
+        for sent in self.sentences_in_span(start, end):
+            yield from sent.words_in_span(start, end)
+
+
+def split_sentences(text, word_pat=None, splitter='geniass', cache=None):
+    if cache is None:
+        sentences = sentencebreaks_to_list(text, splitter=splitter)
+    else:
+        sentences = cache.split(text, splitter=splitter)
+    sents = []
+    char_idx = 0
+    for sent_idx, sent in enumerate(sentences):
+        sents.append(Sentence(sent, sent_idx, char_idx, word_pat=word_pat))
+        char_idx += len(sent) + 1  # account for split character
+    return sents
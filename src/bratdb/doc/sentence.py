@@ -1,30 +1,117 @@
 import re
+from array import array
+from bisect import bisect_right
 
 from bratdb.doc.word import Word
 
 
 class Sentence:
-    WORD_PAT = re.compile(r'\w')
+    """
+    Sentence with token offsets stored in compact arrays
 
-    def __init__(self, sentence, idx, char_idx):
+    `Word` objects are only created when accessed. The text of the sentence is either
+    stored on the sentence or, once `set_text_source` has been called, read from the
+    document's text when accessed.
+    """
+    WORD_PAT = re.compile(r'\w+')
+    __slots__ = ('_text', '_text_offset', 'idx', 'start', 'end', '_word_starts', '_word_ends',
+                 '_word_annotations')
+
+    def __init__(self, sentence, idx, char_idx, word_pat=None):
+        """
+
+        :param sentence: text of sentence
+        :param idx: index of sentence in document
+        :param char_idx: offset of sentence in document
+        :param word_pat: regular expression (str or compiled) identifying words;
+            defaults to `Sentence.WORD_PAT`
+        """
         self.sentence = sentence
         self.idx = idx
         self.start = char_idx
         self.end = self.start + len(sentence)
-        self.words = []
-        self._unpack_words()
+        self._word_annotations = None  # word index -> [Annotation, ...]
+        self._unpack_words(self.WORD_PAT if word_pat is None else re.compile(word_pat))
+
+    @property
+    def sentence(self):
+        return self.get_text(self.start, self.end)
+
+    @sentence.setter
+    def sentence(self, value):
+        self._text = value
+        self._text_offset = None  # text begins at `self.start`
+
+    def set_text_source(self, source, offset=0):
+        """Read text from `source` (e.g., `StoredText` of document) which begins at `offset`"""
+        self._text = source
+        self._text_offset = offset
+
+    def get_text(self, start, end):
+        """Text of the document span [start, end)"""
+        offset = self.start if self._text_offset is None else self._text_offset
+        return self._text[start - offset:end - offset]
+
+    def _unpack_words(self, word_pat):
+        spans = [m.span() for m in word_pat.finditer(self.sentence) if m.start() != m.end()]
+        # build arrays in one step to avoid over-allocation
+        self._word_starts = array('I', [self.start + start for start, _ in spans])
+        self._word_ends = array('I', [self.start + end for _, end in spans])
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):  # (None, slots)
+            state = state[1]
+        elif 'words' in state:  # baseline `Sentence`, with a list of `Word` objects
+            self._set_legacy_state(state)
+            return
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def _set_legacy_state(self, state):
+        """Convert the words of a baseline sentence into offset arrays and word annotations"""
+        self.sentence = state['sentence']
+        self.idx = state['idx']
+        self.start = state['start']
+        self.end = state['end']
+        self._word_annotations = None
+        words = state['words']
+        legacy = [word.sentence for word in words]  # state of each word (see `Word.__setstate__`)
+        self._word_starts = array('I', [w['start'] for w in legacy])
+        # baseline `Word.end` was miscalculated, so derive it from the word
+        self._word_ends = array('I', [w['start'] + len(w['word']) for w in legacy])
+        for idx, (word, w) in enumerate(zip(words, legacy)):
+            word.sentence = self
+            word.word_idx = idx
+            for ann in w['_annotations']:
+                self.add_word_annotation(idx, ann)
+
+    def __len__(self):
+        """Number of words"""
+        return len(self._word_starts)
+
+    def get_word(self, idx):
+        return Word(self, idx)
+
+    @property
+    def words(self):
+        return [Word(self, i) for i in range(len(self._word_starts))]
+
+    def get_word_annotations(self, idx):
+        if not self._word_annotations:
+            return []
+        return self._word_annotations.get(idx, [])
+
+    def add_word_annotation(self, idx, ann):
+        if self._word_annotations is None:
+            self._word_annotations = {}
+        self._word_annotations.setdefault(idx, []).append(ann)
 
-    def _unpack_words(self):
-        for i, m in enumerate(self.WORD_PAT.finditer(self.sentence)):
-            word = Word(word=m.group(), start=self.start + m.start(),
-                        end=self.end + m.start(), idx=i, sent_idx=self.idx)
-            self.words.append(word)
+    def words_in_span(self, start, end):
+        """Iterate through words overlapping the character span [start, end)"""
+        for idx in range(bisect_right(self._word_ends, start), len(self._word_starts)):
+            if self._word_starts[idx] >= end:
+                break
+            yield Word(self, idx)
 
     def get_span(self, start, end):
-        for word in self.words:
-            if word.start <= start < word.end:
-                yield word
-            if word.start <= end < word.end:
-                yield word
-            if start <= word.start < end and start < word.end < end:
-                yield word
\ No newline at end of file
+        return self.words_in_span(start, end)
@@ -1,12 +1,51 @@
 class Word:
+    """
+    View of a single word within a `Sentence`
+    """
+    __slots__ = ('sentence', 'word_idx')
 
-    def __init__(self, word, start, end, idx, sent_idx):
-        self.word = word
-        self.start = start
-        self.end = end
+    def __init__(self, sentence, idx):
+        self.sentence = sentence
         self.word_idx = idx
-        self.sent_idx = sent_idx
-        self._annotations = []
+
+    @property
+    def start(self):
+        return self.sentence._word_starts[self.word_idx]
+
+    @property
+    def end(self):
+        return self.sentence._word_ends[self.word_idx]
+
+    @property
+    def word(self):
+        return self.sentence.get_text(self.start, self.end)
+
+    @property
+    def sent_idx(self):
+        return self.sentence.idx
+
+    @property
+    def annotations(self):
+        return self.sentence.get_word_annotations(self.word_idx)
 
     def add_annotation(self, ann):
-        self._annotations.append(ann)
\ No newline at end of file
+        self.sentence.add_word_annotation(self.word_idx, ann)
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):  # (None, slots)
+            state = state[1]
+        elif 'sentence' not in state:  # baseline `Word`: replaced in `Sentence.__setstate__`
+            state = {'sentence': state, 'word_idx': state['word_idx']}
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Word):
+            return NotImplemented
+        return self.sentence is other.sentence and self.word_idx == other.word_idx
+
+    def __hash__(self):
+        return hash((id(self.sentence), self.word_idx))
+
+    def __repr__(self):
+        return f'Word({self.word!r}, {self.start}, {self.end})'
@@ -1,31 +1,51 @@
 import datetime
+import functools
+import glob
+import hashlib
+import itertools
+import json
 import os
 import re
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import pandas as pd
+
+    PANDAS = True
+except ImportError:
+    PANDAS = False
 
 from loguru import logger
 
+from bratdb.funcs.matchers import get_matcher, iter_regex_matches, pop_profile, pop_quarantined, RegexProfile
 from bratdb.funcs.utils import get_output_path
+from bratdb.funcs.writers import get_writer, get_writer_class
+
+OUTPUT_COLUMNS = ('document', 'concept', 'term', 'captured')
 
 
 def get_documents(directory=None, extension='.txt',
                   connection_string=None, query=None,
-                  encoding='utf8', **kwargs):
+                  encoding='utf8', fetch_size=1000, read_threads=4, prefetch=64, **kwargs):
+    """Iterate through (name, text) from files in `directory` or rows returned by `query`
+
+    :param fetch_size: number of rows to fetch from the database at a time
+    :param read_threads: number of threads reading files ahead of the caller (0 to
+        read each file only when requested)
+    :param prefetch: maximum number of files read ahead
+    """
     if directory:
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                if extension and not file.endswith(extension):
-                    continue
-                name = file.split('.')[0]
-                fp = os.path.join(root, file)
-                with open(fp, encoding=encoding, errors='ignore') as fh:
-                    text = clean_text(fh.read().lower())
-                yield name, text
+        files = iter_files(directory, extension)
+        if read_threads:
+            yield from _prefetch_documents(files, encoding, read_threads, prefetch)
+        else:
+            for name, fp in files:
+                yield name, read_document(fp, encoding)
     elif connection_string and query:
-        import sqlalchemy as sqla
         if isinstance(query, (list, tuple)):
             query = ' '.join(query)
-        eng = sqla.create_engine(connection_string)
-        for row in eng.execute(query):
+        for row in iter_query(connection_string, query, fetch_size=fetch_size):
             name = ','.join(str(x) for x in row[:-1])
             text = row[-1]
             yield name, text
@@ -34,118 +54,487 @@ def get_documents(directory=None, extension='.txt',
                          ' both `connection_string` and `query`')
 
 
+def iter_files(directory, extension='.txt'):
+    """Iterate through (name, path) of files in `directory` with `extension`"""
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if extension and not file.endswith(extension):
+                continue
+            yield file.split('.')[0], os.path.join(root, file)
+
+
+def read_document(fp, encoding='utf8'):
+    with open(fp, encoding=encoding, errors='ignore') as fh:
+        return clean_text(fh.read().lower())
+
+
+def _prefetch_documents(files, encoding='utf8', read_threads=4, prefetch=64):
+    """Read (name, path) of `files` in a thread pool, yielding (name, text) in order
+
+    At most `prefetch` files are read ahead, so that waiting on storage overlaps with
+    the caller's processing without loading the whole corpus into memory.
+    """
+    with ThreadPoolExecutor(max_workers=read_threads) as executor:
+        pending = deque()
+        try:
+            for name, fp in files:
+                pending.append((name, executor.submit(read_document, fp, encoding)))
+                if len(pending) >= max(prefetch, 1):
+                    name, future = pending.popleft()
+                    yield name, future.result()
+            while pending:
+                name, future = pending.popleft()
+                yield name, future.result()
+        finally:  # e.g., stopped early
+            for name, future in pending:
+                future.cancel()
+
+
+_engines = {}  # connection string -> sqlalchemy engine
+
+
+def get_engine(connection_string):
+    """Create sqlalchemy engine, reusing (along with its connection pool) any already created"""
+    if connection_string not in _engines:
+        import sqlalchemy as sqla
+        _engines[connection_string] = sqla.create_engine(connection_string)
+    return _engines[connection_string]
+
+
+def iter_query(connection_string, query, fetch_size=1000):
+    """Stream rows of `query`, fetching `fetch_size` rows at a time
+
+    Requests a server-side cursor (`stream_results`) where the database driver
+    supports it, so that the result set is not loaded into memory.
+    """
+    import sqlalchemy as sqla
+    with get_engine(connection_string).connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, max_row_buffer=fetch_size
+        ).execute(sqla.text(query))
+        try:
+            rows = result.fetchmany(fetch_size)
+            while rows:
+                yield from rows
+                rows = result.fetchmany(fetch_size)
+        finally:
+            result.close()
+
+
 def clean_text(text):
     return text.replace('\n', ' ').replace('\t', ' ')
 
 
-def compile_regexes(regex_file, encoding='utf8'):
+def compile_regexes(regex_file, encoding='utf8', with_literals=False):
     """
     Reads and compiles regular expressions
     :param encoding:
-    :param regex_file: concept \t term \t regex
-    :return:
+    :param regex_file: concept \t term \t regex [\t literals]
+    :param with_literals: if True, also return the required literals of each regex
+        (empty if the file has no literals column)
+    :return: [(concept, term, regex), ...] or, with_literals, ([...], [(literal, ...), ...])
     """
     res = []
+    literals = []
     with open(regex_file, encoding=encoding) as fh:
         for line in fh:
-            concept, term, regex = line.strip().split('\t')
+            concept, term, regex, *rest = line.strip().split('\t')
             res.append((concept, term, re.compile(regex, re.IGNORECASE)))
+            literals.append(tuple(rest[0].split()) if rest else ())
+    if with_literals:
+        return res, literals
     return res
 
 
 def check_time_expired(start_time, run_hours):
     if not run_hours:
         return False
-    return start_time + datetime.timedelta(hours=run_hours) > datetime.datetime.now()
+    return datetime.datetime.now() > start_time + datetime.timedelta(hours=run_hours)
+
+
+def get_checkpoint_path(outpath):
+    return f'{outpath}.checkpoint'
+
+
+def read_checkpoint(outpath):
+    """Read checkpoint of `apply_regex_to_corpus` output file; None if not found"""
+    path = get_checkpoint_path(outpath)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf8') as fh:
+        return json.load(fh)
+
+
+def write_checkpoint(outpath, offset, *, documents, last_document, matches, completed=False):
+    """Record progress of output file `outpath`: everything before `offset` (see
+    `BatchWriter.checkpoint`) is the output of the first `documents` documents"""
+    path = get_checkpoint_path(outpath)
+    with open(f'{path}.tmp', 'w', encoding='utf8') as fh:
+        json.dump({
+            'documents': documents,
+            'last_document': last_document,
+            'matches': matches,
+            'offset': offset,
+            'completed': completed,
+        }, fh)
+    os.replace(f'{path}.tmp', path)
+
+
+def find_resumable_output(outpath_prefix, output_format='tsv'):
+    """Find most recent output file (starting with `outpath_prefix`) with a checkpoint
+
+    :return: (output file, checkpoint) or (None, None) if not found
+    """
+    for path in sorted(glob.glob(f'{glob.escape(str(outpath_prefix))}.*.{output_format}'), reverse=True):
+        checkpoint = read_checkpoint(path)
+        if checkpoint is not None:
+            return path, checkpoint
+    return None, None
+
+
+def get_quarantine_path(outpath):
+    return f'{outpath}.quarantine.tsv'
+
+
+def read_quarantined(outpath, regexes):
+    """Indices of regexes quarantined while writing `outpath` (see `GuardedMatcher`)"""
+    path = get_quarantine_path(outpath)
+    if not os.path.exists(path):
+        return set()
+    index = {(concept, term, regex.pattern): idx for idx, (concept, term, regex) in enumerate(regexes)}
+    quarantined = set()
+    with open(path, encoding='utf8') as fh:
+        next(fh)  # header
+        for line in fh:
+            concept, term, pattern, *_ = line.rstrip('\n').split('\t')
+            if (concept, term, pattern) in index:
+                quarantined.add(index[concept, term, pattern])
+    return quarantined
+
+
+def _skip_documents(documents, checkpoint):
+    """Skip the documents already processed according to `checkpoint`"""
+    name = None
+    for _, (name, _) in zip(range(checkpoint['documents']), documents):
+        pass
+    if name != checkpoint['last_document']:
+        logger.warning(f'Expected last processed document to be "{checkpoint["last_document"]}",'
+                       f' but found "{name}": has the corpus (or query ordering) changed?')
+    return documents
 
 
 def apply_regexes_to_text(regexes, text, newline_replace=' ',
                           exclude_captured=False, include_context: int = 0):
-    for concept, term, regex in regexes:
-        for m in regex.finditer(text):
-            capture = '' if exclude_captured else m.group()
-            capture = capture.replace('\n', newline_replace)
-            if include_context:
-                precontext = text[max(0, m.start() - include_context):m.start()].strip().replace('\n', newline_replace)
-                postcontext = text[m.end():m.end() + include_context].strip().replace('\n', newline_replace)
-                yield concept, term, capture, precontext, postcontext
-            else:
-                yield concept, term, capture
+    for concept, term, m in iter_regex_matches(regexes, text):
+        capture = '' if exclude_captured else m.group()
+        capture = capture.replace('\n', newline_replace)
+        if include_context:
+            precontext = text[max(0, m.start() - include_context):m.start()].strip().replace('\n', newline_replace)
+            postcontext = text[m.end():m.end() + include_context].strip().replace('\n', newline_replace)
+            yield concept, term, capture, precontext, postcontext
+        else:
+            yield concept, term, capture
 
 
-def apply_regex_to_df(regex, df, *, encoding='utf8', newline_replace=' ',
-                      exclude_captured=False, include_context: int = 0):
+def apply_regex_to_df(regex, df, *, text_col='note_text', encoding='utf8', newline_replace=' ',
+                      exclude_captured=False, include_context: int = 0, engine=None,
+                      prefilter=True, workers=1, batch_size=1000, as_dataframe=True):
     """Apply regular expressions to a dataframe rather than text.
 
+    Rows are processed in batches, which can be run across multiple processes.
     :param regex: file containing regular expressions in bratdb format
-    :param df:
+    :param df: pandas dataframe; the index is used as the id of each row
+    :param text_col: name of column containing text (rows with missing text are skipped)
     :param encoding:
     :param newline_replace:
     :param exclude_captured:
     :param include_context: specify the amount of contextual characters to include.
+    :param engine: 'fused' to combine regexes (see `FusedMatcher`) or 'loop' to
+        run each regex separately; both produce the same results (default: 'loop'
+        if prefiltering, otherwise 'fused')
+    :param prefilter: if True, skip regexes whose required literals (if included
+        in the regex file) do not occur in the text (see `KeywordPrefilter`)
+    :param workers: number of processes to apply regexes with
+    :param batch_size: number of rows to send to each worker at a time
+    :param as_dataframe: if False, return list of tuples rather than a dataframe
 
-    :return: list of tuples that can be loaded into pandas dataframe with
+    :return: dataframe with columns ['id', 'concept', 'term', 'capture'] (and
+        ['precontext', 'postcontext'] if `include_context`); concept and term are
+        categorical
+        if not `as_dataframe`, list of tuples that can be loaded into pandas dataframe with
         pd.DataFrame(
-            apply_regex_to_df(regex_file, df),
+            apply_regex_to_df(regex_file, df, as_dataframe=False),
             columns=['id', 'concept', 'term', 'capture']
         )
-        or
-        pd.DataFrame(
-            apply_regex_to_df(regex_file, df, include_context=100),
-            columns=['id', 'concept', 'term', 'capture', 'precontext', 'postcontext']
-        )
     """
-    regexes = compile_regexes(regex, encoding)
+    if as_dataframe and not PANDAS:
+        raise ImportError('Returning a dataframe requires `pandas`: pip install pandas')
+    regexes, literals = compile_regexes(regex, encoding, with_literals=True)
+    regexes = get_matcher(regexes, engine, literals if prefilter else None)
+    func = functools.partial(_apply_regexes_to_rows, newline_replace=newline_replace,
+                             exclude_captured=exclude_captured, include_context=include_context)
     res = []
-    for r in df.itertuples():
-        for concept, term, capture, *rest in apply_regexes_to_text(
-                regexes, r.note_text,
-                include_context=include_context,
-                newline_replace=newline_replace,
-                exclude_captured=exclude_captured,
-        ):
-            if include_context:
-                res.append((r.Index, concept, term, capture, rest[0], rest[1]))
-            else:
-                res.append((r.Index, concept, term, capture))
-    return res
+    for rows in _run_batches(func, iter_batches(zip(df.index, df[text_col]), batch_size), regexes, workers):
+        res.extend(rows)
+    if not as_dataframe:
+        return res
+    columns = ['id', 'concept', 'term', 'capture']
+    if include_context:
+        columns += ['precontext', 'postcontext']
+    result = pd.DataFrame.from_records(res, columns=columns)
+    return result.astype({'concept': 'category', 'term': 'category'})
+
+
+def _apply_regexes_to_rows(batch, regexes=None, cache=None, **kwargs):
+    """Apply regexes to a batch of (id, text), returning rows of `apply_regex_to_df`"""
+    if regexes is None:
+        regexes = _worker_regexes
+    rows = []
+    for idx, text in batch:
+        if not isinstance(text, str):  # missing
+            continue
+        for match in apply_regexes_to_text(regexes, text, **kwargs):
+            rows.append((idx, *match))
+    return rows
 
 
 def apply_regex_to_corpus(regex, outpath=None, encoding='utf8',
                           run_hours=None, exclude_captured=False,
-                          log_incr=10000, newline_replace=' ',
-                          **kwargs):
+                          log_incr=10000, newline_replace=' ', engine=None,
+                          prefilter=True, workers=1, batch_size=100, resume=False,
+                          output_format='tsv', profile_regexes=False, regex_timeout=None,
+                          dedupe=False, dedupe_cache_size=10000, **kwargs):
     """
     :param regex:
     :param outpath:
     :param encoding:
-    :param run_hours:
+    :param run_hours: stop (gracefully) after this many hours; continue with `resume`
     :param exclude_captured:
     :param log_incr: number of records to run before reporting how long this many
-        documents took to run
+        documents took to run (progress is also saved to a checkpoint file)
+    :param engine: 'fused' to combine regexes (see `FusedMatcher`) or 'loop' to
+        run each regex separately; both produce the same results (default: 'loop'
+        if prefiltering, otherwise 'fused')
+    :param prefilter: if True, skip regexes whose required literals (if included
+        in the regex file) do not occur in a document (see `KeywordPrefilter`)
+    :param workers: number of processes to apply regexes with; output is
+        identical regardless of `workers`
+    :param batch_size: number of documents to send to each worker at a time
+    :param resume: if True, continue the most recent incomplete output file from its
+        checkpoint; the documents must be returned in the same order
+    :param output_format: one of `writers.OUTPUT_FORMATS`: 'tsv', 'tsv.gz', 'tsv.zst',
+        'parquet', or 'sqlite'
+    :param profile_regexes: if True, record the time taken by each regex, and write
+        a report (slowest regexes first) to `<output file>.profile.tsv`
+    :param regex_timeout: maximum seconds to run each regex on a document (requires
+        `regex`); regexes exceeding this are no longer run, and are listed in
+        `<output file>.quarantine.tsv`
+    :param dedupe: if True, reuse the matches of recently seen documents with
+        identical text, rather than applying regexes again (see `MatchCache`)
+    :param dedupe_cache_size: number of documents to remember matches of (in each worker)
     :param kwargs:
-    :return:
+    :return: path to output file
     """
     _outpath = get_output_path(regex, outpath, exts=('apply',))
     start_time = datetime.datetime.now()
-    dt = start_time.strftime('%Y%m%d_%H%M%S')
-    outpath = f'{_outpath}.{dt}.tsv'
+    checkpoint = None
+    if resume and not get_writer_class(output_format).resumable:
+        logger.warning(f'Cannot resume {output_format} output: starting new output file.')
+    elif resume:
+        outpath, checkpoint = find_resumable_output(_outpath, output_format)
+        if checkpoint is None:
+            logger.warning(f'No checkpoint found to resume for: {_outpath}')
+        elif checkpoint['completed']:
+            logger.info(f'Output file already completed: {outpath}')
+            return outpath
+        else:
+            logger.info(f'Resuming after {checkpoint["documents"]} documents.')
+    if checkpoint is None:
+        dt = start_time.strftime('%Y%m%d_%H%M%S')
+        outpath = f'{_outpath}.{dt}.{output_format}'
     logger.info(f'Primary output file: {outpath}')
-    regexes = compile_regexes(regex, encoding)
-    logger.info(f'Compiled {len(regexes)} regexes.')
-    rx_cnt = 0
+    compiled, literals = compile_regexes(regex, encoding, with_literals=True)
+    logger.info(f'Compiled {len(compiled)} regexes.')
+    quarantined = read_quarantined(outpath, compiled) if checkpoint else set()
+    if quarantined:
+        logger.info(f'Skipping {len(quarantined)} regexes quarantined in previous run.')
+    regexes = get_matcher(compiled, engine, literals if prefilter else None, profile=profile_regexes,
+                          timeout=regex_timeout, quarantined=quarantined)
+    profile = RegexProfile(len(compiled)) if profile_regexes else None
     logger.info('Loading files.')
-    with open(outpath, 'w', encoding=encoding) as out:
-        out.write('document\tconcept\tterm\tcaptured\n')
-        for i, (name, doc) in enumerate(get_documents(**kwargs)):
-            for concept, term, regex in regexes:
-                for m in regex.finditer(doc):
-                    rx_cnt += 1
-                    capture = '' if exclude_captured else m.group()
-                    capture = capture.replace('\n', newline_replace)
-                    out.write(f'{name}\t{concept}\t{term}\t{capture}\n')
-            if i % log_incr == 0:
-                logger.info(f'Completed {i + 1} documents ({rx_cnt} concepts identified)')
-                if check_time_expired(start_time, run_hours):
-                    logger.warning(f'Time expired.')
-    logger.info(f'Process completed: {i + 1} documents in {datetime.datetime.now() - start_time}')
+    documents = get_documents(**kwargs)
+    if checkpoint is None:
+        rx_cnt = 0
+        n_docs = 0
+        last_name = None
+    else:
+        rx_cnt = checkpoint['matches']
+        n_docs = checkpoint['documents']
+        last_name = checkpoint['last_document']
+        documents = _skip_documents(documents, checkpoint)
+    batches = iter_batches(documents, batch_size)
+    func = functools.partial(_apply_regexes_to_batch, exclude_captured=exclude_captured,
+                             newline_replace=newline_replace)
+    completed = True
+    skipped = 0
+    with get_writer(output_format, outpath, OUTPUT_COLUMNS, encoding=encoding,
+                    offset=checkpoint['offset'] if checkpoint else None) as out:
+        for result in _run_batches(func, batches, regexes, workers, dedupe_cache_size if dedupe else 0):
+            out.add(result.rows)
+            if profile is not None:
+                profile.update(result.profile)
+            for idx, name in result.quarantined:
+                if idx not in quarantined:  # may be quarantined by multiple workers
+                    quarantined.add(idx)
+                    _quarantine_regex(outpath, compiled[idx], name, regex_timeout)
+            rx_cnt += len(result.rows)
+            skipped += result.skipped
+            last_name = result.last_document
+            prev_docs, n_docs = n_docs, n_docs + result.documents
+            if (prev_docs - 1) // log_incr != (n_docs - 1) // log_incr:  # passed 1, log_incr + 1, ...
+                logger.info(f'Completed {n_docs} documents ({rx_cnt} concepts identified)')
+                write_checkpoint(outpath, out.checkpoint(), documents=n_docs, last_document=last_name,
+                                 matches=rx_cnt)
+            if check_time_expired(start_time, run_hours):
+                logger.warning(f'Time expired: stopping after {n_docs} documents; run with `--resume` to continue.')
+                completed = False
+                break
+        write_checkpoint(outpath, out.checkpoint(), documents=n_docs, last_document=last_name,
+                         matches=rx_cnt, completed=completed)
+    if profile is not None:
+        _write_profile_report(profile, compiled, f'{outpath}.profile.tsv')
+    if completed:
+        logger.info(f'Process completed: {n_docs} documents in {datetime.datetime.now() - start_time}'
+                    + (f' ({skipped} duplicate documents skipped)' if dedupe else ''))
+    return outpath
+
+
+def _quarantine_regex(outpath, regex, name, timeout):
+    concept, term, regex = regex
+    logger.warning(f'Quarantined regex exceeding {timeout}s on document {name}: {concept}/{term}: {regex.pattern}')
+    path = get_quarantine_path(outpath)
+    exists = os.path.exists(path)
+    with open(path, 'a', encoding='utf8') as out:
+        if not exists:
+            out.write('concept\tterm\tregex\tdocument\ttimeout\n')
+        out.write(f'{concept}\t{term}\t{regex.pattern}\t{name}\t{timeout}\n')
+
+
+def _write_profile_report(profile, regexes, path, n_slowest=5):
+    order = profile.write_report(regexes, path)
+    logger.info(f'Regex profile written to: {path}')
+    for idx in order[:n_slowest]:
+        concept, term, regex = regexes[idx]
+        logger.info(f'{profile.seconds[idx]:.3f}s (max: {profile.max_seconds[idx]:.3f}s)'
+                    f' {concept}/{term}: {regex.pattern}')
+
+
+def iter_batches(iterable, batch_size):
+    """Split `iterable` into lists of `batch_size` items"""
+    it = iter(iterable)
+    batch = list(itertools.islice(it, batch_size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(it, batch_size))
+
+
+class MatchCache:
+    """Matches of the most recently used documents, keyed by a hash of their text"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def get_key(text):
+        return hashlib.sha1(text.encode('utf8', errors='surrogatepass')).digest()
+
+    def get(self, key):
+        """Return cached matches, or None if not found"""
+        value = self._cache.get(key)
+        if value is not None:
+            self._cache.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._cache[key] = value
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+
+BatchResult = namedtuple('BatchResult', [
+    'documents',  # number of documents
+    'last_document',  # name of last document
+    'rows',  # output rows
+    'profile',  # `RegexProfile` or None
+    'quarantined',  # [(index of quarantined regex, document name), ...]
+    'skipped',  # number of documents with matches from cache
+])
+
+_worker_regexes = None  # regexes (or matcher) in worker process
+_worker_cache = None  # `MatchCache` in worker process
+
+
+def _init_worker(regexes, cache_size=0):
+    global _worker_regexes, _worker_cache
+    _worker_regexes = regexes
+    _worker_cache = MatchCache(cache_size) if cache_size else None
+
+
+def _apply_regexes_to_batch(batch, regexes=None, cache=None, exclude_captured=False, newline_replace=' '):
+    """Apply regexes to a batch of (name, document), returning a `BatchResult`
+
+    :param cache: `MatchCache` to reuse matches of duplicate documents
+    """
+    if regexes is None:
+        regexes, cache = _worker_regexes, _worker_cache
+    rows = []
+    quarantined = []
+    skipped = 0
+    for name, doc in batch:
+        key = None
+        if cache is not None:
+            key = cache.get_key(doc)
+            matches = cache.get(key)
+            if matches is not None:
+                rows.extend((name, *match) for match in matches)
+                skipped += 1
+                continue
+        matches = []
+        for concept, term, m in iter_regex_matches(regexes, doc):
+            capture = '' if exclude_captured else m.group()
+            capture = capture.replace('\n', newline_replace)
+            matches.append((concept, term, capture))
+        rows.extend((name, *match) for match in matches)
+        quarantined.extend((idx, name) for idx in pop_quarantined(regexes))
+        if key is not None:
+            cache.set(key, tuple(matches))
+    return BatchResult(len(batch), batch[-1][0], rows, pop_profile(regexes), quarantined, skipped)
+
+
+def _run_batches(func, batches, regexes, workers=1, cache_size=0):
+    """Iterate through results of `func` for each batch, in order
+
+    With multiple workers, only a few batches per worker are read ahead, so that
+    the documents are not all loaded into memory.
+    :param cache_size: if non-zero, size of `MatchCache` (in each worker)
+    """
+    if not workers or workers <= 1:
+        cache = MatchCache(cache_size) if cache_size else None
+        for batch in batches:
+            yield func(batch, regexes, cache)
+        return
+    logger.info(f'Applying regexes with {workers} workers.')
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(regexes, cache_size)) as executor:
+        pending = deque()
+        try:
+            for batch in batches:
+                pending.append(executor.submit(func, batch))
+                if len(pending) >= workers * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:  # e.g., stopped early
+            for future in pending:
+                future.cancel()
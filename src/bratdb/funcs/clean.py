@@ -24,17 +24,17 @@ def remove_duplicates(extract_or_regexify, outpath=None, encoding='utf8', **kwar
 
     existing_terms = {}
     for line in text.split('\n'):
-        concept, name, term = line.split('\t')
+        concept, name, term, *rest = line.split('\t')  # regexify files may include literals
         if term in existing_terms:
-            c, n, t = existing_terms[term]
+            c, n, t, *_ = existing_terms[term]
             logger.warning(f'Found duplicate term "{term}"')
             if concept != c:
                 logger.warning(f'Concept differs: {concept} ({name}) vs {c} ({n})')
             if len(name) < len(n):  # keep the shortest/simplest spelling
-                existing_terms[term] = (concept, name, term)
+                existing_terms[term] = (concept, name, term, *rest)
         else:
-            existing_terms[term] = (concept, name, term)
+            existing_terms[term] = (concept, name, term, *rest)
 
     with open(outpath, 'w', encoding=encoding) as out:
-        for c, n, t in existing_terms.values():
-            out.write(f'{c}\t{n}\t{t}\n')
+        for line in existing_terms.values():
+            out.write('\t'.join(line) + '\n')
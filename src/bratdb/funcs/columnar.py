@@ -0,0 +1,132 @@
+"""
+Export a brat dump to columnar Parquet tables (requires `pyarrow`).
+
+Writes one file per table to the output directory:
+    * annotations.parquet: one row per annotation and label
+    * attributes.parquet: one row per annotation attribute
+    * sentences.parquet: one row per sentence
+Repeated strings (document names, labels, attribute names) are dictionary-encoded,
+and are loaded as categoricals by `pandas.read_parquet`.
+"""
+import os
+
+from loguru import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    PYARROW = True
+except ImportError:
+    PYARROW = False
+
+from bratdb.funcs.utils import load_brat_dump, get_output_path
+
+DICTIONARY_COLUMNS = {'document', 'label', 'attribute'}
+
+
+def _get_schemas():
+    def string_type(name):
+        return pa.dictionary(pa.int32(), pa.string()) if name in DICTIONARY_COLUMNS else pa.string()
+
+    return {
+        'annotations': pa.schema([
+            ('document', string_type('document')),
+            ('entry', pa.int32()),
+            ('key', pa.string()),
+            ('label', string_type('label')),
+            ('text', pa.string()),
+            ('start', pa.int64()),
+            ('end', pa.int64()),
+            ('spans', pa.list_(pa.list_(pa.int64(), 2))),
+        ]),
+        'attributes': pa.schema([
+            ('document', string_type('document')),
+            ('entry', pa.int32()),
+            ('key', pa.string()),
+            ('attribute', string_type('attribute')),
+            ('value', pa.string()),
+        ]),
+        'sentences': pa.schema([
+            ('document', string_type('document')),
+            ('idx', pa.int32()),
+            ('start', pa.int64()),
+            ('end', pa.int64()),
+            ('text', pa.string()),
+        ]),
+    }
+
+
+class _TableWriter:
+    """Buffer rows of a table by column, writing a row group every `batch_size` rows"""
+
+    def __init__(self, path, schema, batch_size):
+        self.schema = schema
+        self.batch_size = batch_size
+        self.columns = {name: [] for name in schema.names}
+        self.writer = pq.ParquetWriter(path, schema)
+        self.count = 0
+
+    def add(self, *row):
+        for column, value in zip(self.columns.values(), row):
+            column.append(value)
+        if len(self.columns['document']) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.columns['document']:
+            return
+        arrays = []
+        for field in self.schema:
+            values = self.columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=field.type.value_type).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self.count += len(self.columns['document'])
+        self.columns = {name: [] for name in self.schema.names}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def export_brat_dump(bratdb, *, outpath=None, include_sentences=True, batch_size=100_000):
+    """Write annotations, attributes, and sentences of a brat dump to Parquet files
+
+    :param bratdb: path to brat dump (any version, see `load_brat_dump`)
+    :param outpath: output directory (default: alongside `bratdb`)
+    :param include_sentences: if False, don't write sentences table
+    :param batch_size: number of rows per row group
+    :return: output directory
+    """
+    if not PYARROW:
+        raise ImportError('Exporting to Parquet requires `pyarrow`: pip install pyarrow')
+    outpath = outpath or get_output_path(bratdb, exts=('parquet',))
+    os.makedirs(outpath, exist_ok=True)
+    schemas = _get_schemas()
+    if not include_sentences:
+        del schemas['sentences']
+    writers = {name: _TableWriter(os.path.join(outpath, f'{name}.parquet'), schema, batch_size)
+               for name, schema in schemas.items()}
+    try:
+        for name, annots, document in load_brat_dump(bratdb):
+            for entry, annotations in enumerate(annots):
+                for key, ann in annotations.items():
+                    start, end = ann.fullspan
+                    spans = [list(span) for span in ann.spans]
+                    for label in ann.labels:
+                        writers['annotations'].add(name, entry, key, label, ann.text, start, end, spans)
+                    for attribute, value in ann.attributes.items():
+                        writers['attributes'].add(name, entry, key, attribute, str(value))
+            if include_sentences:
+                for sent in document:
+                    writers['sentences'].add(name, sent.idx, sent.start, sent.end, sent.sentence)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    for name, writer in writers.items():
+        logger.info(f'Wrote {writer.count} rows to {name}.parquet')
+    logger.info(f'Parquet files written to: {outpath}')
+    return outpath
@@ -40,18 +40,25 @@ def build_frequency_file(bratdb, *, outpath=None, title='Term Frequency', **kwar
         out.write_all(rst_list)
 
 
-def get_frequency(bratdb, *, dbversion=0, once_per_document=True,
-                  max_length=80, normalize=True):
+def get_frequency(bratdb, *, dbversion=None, once_per_document=True,
+                  max_length=80, normalize=True, keep_tags=None, ignore_tags=None):
     """
 
     :param normalize: cleanup various forms to some canonical
     :param max_length:
     :param bratdb: path to bratdb dump
-    :param dbversion: version of dumped brat data to use
+    :param dbversion: version of dumped brat data to use (default: detect from `bratdb`)
     :param once_per_document: if IRR record, only take one of the results
+    :param keep_tags: only count these labels; overrides `ignore_tags`
+    :param ignore_tags: do not count these labels
     :return:
     """
     data = load_brat_dump(bratdb, version=dbversion)
+    if hasattr(data, 'get_term_frequency'):  # e.g., sqlite dump: run as query
+        return data.get_term_frequency(once_per_document=once_per_document, max_length=max_length,
+                                       normalize=normalize, keep_tags=keep_tags, ignore_tags=ignore_tags)
+    keep_tags = set(keep_tags) if keep_tags else None
+    ignore_tags = set(ignore_tags) if ignore_tags and not keep_tags else set()
     counter = defaultdict(Counter)
     for docid, doc_annots in data.annots.items():
         if once_per_document:
@@ -63,5 +70,7 @@ def get_frequency(bratdb, *, dbversion=0, once_per_document=True,
             if normalize:
                 text = text.lower()
             for label in annot.labels:
+                if (keep_tags and label not in keep_tags) or label in ignore_tags:
+                    continue
                 counter[label][text[:max_length]] += 1
     return counter
@@ -0,0 +1,444 @@
+"""
+Matchers which find the matches of regular expressions for `bdb-apply`.
+
+All matchers (see `get_matcher`) iterate through (concept, term, match) in the
+same order as looping over the regexes, calling `finditer` for each:
+    * `FusedMatcher`: combine regexes with shared prefixes to scan documents fewer times
+    * `PrefilteredMatcher`: skip regexes whose required literals are absent (see `KeywordPrefilter`)
+    * `ProfilingMatcher`: record the time and matches of each regex (see `RegexProfile`)
+    * `GuardedMatcher`: quarantine regexes exceeding a time limit (requires `regex`)
+"""
+import re
+import time
+from collections import defaultdict
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    import ahocorasick
+
+    AHOCORASICK = True
+except ImportError:
+    AHOCORASICK = False
+
+try:
+    import regex as regex_package
+
+    REGEX_PACKAGE = True
+except ImportError:
+    REGEX_PACKAGE = False
+
+from loguru import logger
+
+
+class FusedMatcher:
+    """
+    Find the matches of many regular expressions, scanning documents fewer times
+
+    Regexes which begin with the same literal character (optionally preceded by
+    anchors such as `\\b`) are joined into a single alternation pattern, from which
+    `re` factors out the shared prefix; scanning for this pattern is much faster than
+    scanning for each regex separately. Each position at which the combined pattern
+    matches is a candidate: the regexes of the group are then only tried (with
+    `match`) at these positions. As every position at which any regex in the group
+    matches is a candidate, the matches (and their order) are identical to running
+    `finditer` for each regex in turn.
+    """
+    # backreferences and inline flags can't be combined with other patterns
+    UNFUSABLE_PAT = re.compile(r'\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)')
+    # scanning with a combined pattern costs about as much as scanning for 3 regexes,
+    #  so groups with fewer regexes (e.g., after prefiltering) are run separately
+    MIN_FUSED = 4
+
+    def __init__(self, regexes):
+        """
+
+        :param regexes: list of (concept, term, compiled regex), see `compile_regexes`
+        """
+        self.regexes = regexes
+        groups = defaultdict(list)
+        self.unfused = []  # indices of regexes to run separately
+        for idx, (_, _, regex) in enumerate(regexes):
+            key = self._get_prefix(regex)
+            if key is None:
+                self.unfused.append(idx)
+            else:
+                groups[key].append(idx)
+        self.groups = []  # (combined pattern, [index of regex, ...])
+        for indices in groups.values():
+            if len(indices) == 1:
+                self.unfused.extend(indices)
+                continue
+            try:
+                combined = re.compile('|'.join(regexes[idx][2].pattern for idx in indices),
+                                      regexes[indices[0]][2].flags)
+            except re.error:
+                self.unfused.extend(indices)
+                continue
+            self.groups.append((combined, indices))
+
+    def _get_prefix(self, regex):
+        """Leading anchors and first literal of `regex`, or None if it can't be combined"""
+        if not isinstance(regex.pattern, str) or self.UNFUSABLE_PAT.search(regex.pattern):
+            return None
+        try:
+            items = sre_parse.parse(regex.pattern, regex.flags).data
+        except Exception:
+            return None
+        if any(op is sre_parse.BRANCH for op, _ in items):  # top-level alternation
+            return None
+        prefix = [regex.flags]
+        for op, av in items:
+            prefix.append((op, av))
+            if op is sre_parse.LITERAL:
+                return tuple(prefix)
+            if op is not sre_parse.AT:
+                return None
+        return None
+
+    def __len__(self):
+        return len(self.regexes)
+
+    def __iter__(self):
+        return iter(self.regexes)
+
+    def finditer(self, text, active=None):
+        """Iterate through (concept, term, match) in the same order as looping over regexes
+
+        :param active: if specified, only run regexes with these indices
+        """
+        matches = {}  # index of regex -> [match, ...]
+        for combined, indices in self.groups:
+            if active is not None:
+                indices = [idx for idx in indices if idx in active]
+            if len(indices) < self.MIN_FUSED:
+                for idx in indices:
+                    matches[idx] = self.regexes[idx][2].finditer(text)
+                continue
+            candidates = []
+            m = combined.search(text)
+            while m is not None:
+                candidates.append(m.start())
+                m = combined.search(text, m.start() + 1)
+            if not candidates:
+                continue
+            for idx in indices:
+                regex = self.regexes[idx][2]
+                found = []
+                end = 0
+                for pos in candidates:
+                    if pos < end:  # matches of a regex don't overlap
+                        continue
+                    m = regex.match(text, pos)
+                    if m is not None:
+                        found.append(m)
+                        end = m.end()
+                if found:
+                    matches[idx] = found
+        for idx in self.unfused:
+            if active is None or idx in active:
+                matches[idx] = self.regexes[idx][2].finditer(text)
+        for idx in sorted(matches):
+            concept, term, _ = self.regexes[idx]
+            for m in matches[idx]:
+                yield concept, term, m
+
+
+class KeywordPrefilter:
+    """
+    Find the regexes which might match a document, based on their required literals
+
+    A regex can only match if all of its literals (see `regexify_keywords_to_file`)
+    occur in the lowercased document. The literals are found using an Aho-Corasick
+    automaton if `pyahocorasick` is installed, otherwise by substring search.
+
+    Only ascii literals are used: `re.IGNORECASE` treats some other characters as
+    the same letter though `str.lower` does not (e.g., µ and μ, or σ and ς), so a
+    regex whose literals are all non-ascii is always run.
+    """
+    # characters which `re.IGNORECASE` matches to ascii letters, though `str.lower` doesn't
+    CASEFOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's'})
+
+    def __init__(self, literals):
+        """
+
+        :param literals: list of required literals for each regex (regexes with
+            no ascii literals are always run)
+        """
+        self.literals = [tuple({lit.lower() for lit in lits if lit.isascii()}) for lits in literals]
+        self.always = {idx for idx, lits in enumerate(self.literals) if not lits}
+        # index regexes by their longest (likely rarest) literal
+        self.by_literal = defaultdict(list)
+        for idx, lits in enumerate(self.literals):
+            if lits:
+                self.by_literal[max(lits, key=len)].append(idx)
+        self.all_literals = {lit for lits in self.literals for lit in lits}
+        self.automaton = None
+        if AHOCORASICK and self.all_literals:
+            self.automaton = ahocorasick.Automaton()
+            for lit in self.all_literals:
+                self.automaton.add_word(lit, lit)
+            self.automaton.make_automaton()
+
+    def find_literals(self, text):
+        """Set of literals which occur in `text`"""
+        text = text.lower() if text.isascii() else text.translate(self.CASEFOLD).lower()
+        if self.automaton is not None:
+            return {lit for _, lit in self.automaton.iter(text)}
+        return {lit for lit in self.all_literals if lit in text}
+
+    def get_active(self, text):
+        """Set of indices of regexes which might match `text`"""
+        found = self.find_literals(text)
+        active = set(self.always)
+        for lit in found & self.by_literal.keys():
+            for idx in self.by_literal[lit]:
+                if all(x in found for x in self.literals[idx]):
+                    active.add(idx)
+        return active
+
+
+class RegexProfile:
+    """Cumulative statistics of running each regex on documents"""
+
+    def __init__(self, n_regexes):
+        self.seconds = [0.0] * n_regexes
+        self.max_seconds = [0.0] * n_regexes  # slowest single document
+        self.documents = [0] * n_regexes  # number of documents run on
+        self.matched_documents = [0] * n_regexes
+        self.matches = [0] * n_regexes
+
+    def add(self, idx, seconds, n_matches):
+        self.seconds[idx] += seconds
+        self.max_seconds[idx] = max(self.max_seconds[idx], seconds)
+        self.documents[idx] += 1
+        if n_matches:
+            self.matched_documents[idx] += 1
+            self.matches[idx] += n_matches
+
+    def update(self, other):
+        """Add statistics from another profile (e.g., from a worker process)"""
+        for idx in range(len(self.seconds)):
+            self.seconds[idx] += other.seconds[idx]
+            self.max_seconds[idx] = max(self.max_seconds[idx], other.max_seconds[idx])
+            self.documents[idx] += other.documents[idx]
+            self.matched_documents[idx] += other.matched_documents[idx]
+            self.matches[idx] += other.matches[idx]
+
+    def write_report(self, regexes, path):
+        """Write tab-separated report, slowest regexes first
+
+        :param regexes: list of (concept, term, compiled regex)
+        """
+        order = sorted(range(len(self.seconds)), key=lambda idx: -self.seconds[idx])
+        with open(path, 'w', encoding='utf8') as out:
+            out.write('concept\tterm\tregex\tseconds\tmax_seconds\tmean_ms\tdocuments'
+                      '\tmatched_documents\tmatches\n')
+            for idx in order:
+                concept, term, regex = regexes[idx]
+                mean_ms = 1000 * self.seconds[idx] / self.documents[idx] if self.documents[idx] else 0
+                out.write(f'{concept}\t{term}\t{regex.pattern}\t{self.seconds[idx]:.6f}'
+                          f'\t{self.max_seconds[idx]:.6f}\t{mean_ms:.4f}\t{self.documents[idx]}'
+                          f'\t{self.matched_documents[idx]}\t{self.matches[idx]}\n')
+        return order
+
+
+class TimedMatcher:
+    """Run each regex separately, recording its time and matches in a `RegexProfile` if profiling"""
+
+    def __init__(self, regexes, profile=False):
+        """
+
+        :param regexes: list of (concept, term, compiled regex), see `compile_regexes`
+        :param profile: if True, record time taken by each regex
+        """
+        self.regexes = regexes
+        self.profile = RegexProfile(len(regexes)) if profile else None
+
+    def __len__(self):
+        return len(self.regexes)
+
+    def __iter__(self):
+        return iter(self.regexes)
+
+    def _find_matches(self, idx, text):
+        """List of matches of regex `idx` in `text`, or None if it was not run"""
+        return list(self.regexes[idx][2].finditer(text))
+
+    def finditer(self, text, active=None):
+        """Iterate through (concept, term, match) in order of regexes
+
+        :param active: if specified, only run regexes with these indices
+        """
+        for idx in (range(len(self.regexes)) if active is None else sorted(active)):
+            if self.profile is None:
+                matches = self._find_matches(idx, text)
+            else:
+                start = time.perf_counter()
+                matches = self._find_matches(idx, text)
+                if matches is not None:
+                    self.profile.add(idx, time.perf_counter() - start, len(matches))
+            if matches:
+                concept, term, _ = self.regexes[idx]
+                for m in matches:
+                    yield concept, term, m
+
+    def pop_profile(self):
+        """Return profile collected so far (None if not profiling), starting a new one"""
+        profile = self.profile
+        if profile is not None:
+            self.profile = RegexProfile(len(self.regexes))
+        return profile
+
+
+class ProfilingMatcher(TimedMatcher):
+    """Run each regex separately, recording its time and matches in a `RegexProfile`"""
+
+    def __init__(self, regexes):
+        super().__init__(regexes, profile=True)
+
+
+class GuardedMatcher(TimedMatcher):
+    """
+    Run each regex separately, with a time limit for each document (requires `regex`)
+
+    Regexes are compiled with the `regex` package, which supports timeouts. A regex
+    exceeding the limit (e.g., due to catastrophic backtracking) is quarantined: its
+    matches in that document are dropped, and it is not run on later documents.
+    """
+
+    def __init__(self, regexes, timeout, profile=False, quarantined=None):
+        """
+
+        :param regexes: list of (concept, term, compiled regex), see `compile_regexes`
+        :param timeout: maximum seconds to run each regex on each document
+        :param profile: if True, record time taken by each regex (see `RegexProfile`)
+        :param quarantined: indices of regexes not to run (e.g., from a previous run)
+        """
+        if not REGEX_PACKAGE:
+            raise ImportError('Regex timeouts require `regex`: pip install regex')
+        super().__init__(regexes, profile=profile)
+        self.timeout = timeout
+        self.patterns = []
+        for concept, term, regex in regexes:
+            try:
+                self.patterns.append(regex_package.compile(regex.pattern, regex.flags))
+            except regex_package.error as e:
+                logger.warning(f'Running regex without time limit, unsupported by `regex` ({e}):'
+                               f' {concept}/{term}: {regex.pattern}')
+                self.patterns.append(None)
+        self.quarantined = set(quarantined or ())
+        self.new_quarantined = []
+
+    def _find_matches(self, idx, text):
+        if idx in self.quarantined:
+            return None
+        if self.patterns[idx] is None:
+            return super()._find_matches(idx, text)
+        try:
+            return list(self.patterns[idx].finditer(text, timeout=self.timeout))
+        except TimeoutError:
+            self.quarantined.add(idx)
+            self.new_quarantined.append(idx)
+            return []
+
+    def pop_quarantined(self):
+        """Return indices of regexes quarantined since last called"""
+        quarantined, self.new_quarantined = self.new_quarantined, []
+        return quarantined
+
+
+class PrefilteredMatcher:
+    """Only run the regexes of a matcher which pass a `KeywordPrefilter`"""
+
+    def __init__(self, matcher, prefilter):
+        """
+
+        :param matcher: list of (concept, term, compiled regex), or a matcher
+            with `finditer(text, active)` (e.g., `FusedMatcher`)
+        :param prefilter: `KeywordPrefilter` for the same regexes
+        """
+        self.matcher = matcher
+        self.prefilter = prefilter
+
+    def __len__(self):
+        return len(self.matcher)
+
+    def __iter__(self):
+        return iter(self.matcher)
+
+    def finditer(self, text):
+        active = self.prefilter.get_active(text)
+        if not isinstance(self.matcher, list):
+            yield from self.matcher.finditer(text, active)
+            return
+        for idx in sorted(active):
+            concept, term, regex = self.matcher[idx]
+            for m in regex.finditer(text):
+                yield concept, term, m
+
+
+def iter_regex_matches(regexes, text):
+    """Iterate through (concept, term, match) for regexes (list or matcher from `get_matcher`)"""
+    if not isinstance(regexes, list):
+        yield from regexes.finditer(text)
+        return
+    for concept, term, regex in regexes:
+        for m in regex.finditer(text):
+            yield concept, term, m
+
+
+def get_matcher(regexes, engine=None, literals=None, profile=False, timeout=None, quarantined=None):
+    """Prepare regexes from `compile_regexes` for matching with `engine`: 'fused' or 'loop'
+
+    :param engine: if not specified, 'loop' when prefiltering (the few regexes which
+        pass the prefilter are faster to run separately), otherwise 'fused'
+    :param literals: required literals of each regex; if any are present, the regexes
+        are prefiltered using `KeywordPrefilter`
+    :param profile: if True, record time taken by each regex (see `ProfilingMatcher`);
+        regexes are run separately (as with 'loop') regardless of `engine`
+    :param timeout: if specified, maximum seconds to run each regex on a document
+        (see `GuardedMatcher`); regexes are run separately regardless of `engine`
+    :param quarantined: with `timeout`, indices of regexes not to run
+    """
+    prefiltered = bool(literals) and any(literals)
+    if engine is None:
+        engine = 'loop' if prefiltered else 'fused'
+    if timeout:
+        matcher = GuardedMatcher(regexes, timeout, profile=profile, quarantined=quarantined)
+    elif profile:
+        matcher = ProfilingMatcher(regexes)
+    elif engine == 'fused':
+        matcher = FusedMatcher(regexes)
+    elif engine == 'loop':
+        matcher = regexes
+    else:
+        raise ValueError(f'Unknown engine: {engine}')
+    if prefiltered:
+        prefilter = KeywordPrefilter(literals)
+        logger.info(f'Prefiltering {len(regexes) - len(prefilter.always)} regexes on'
+                    f' {len(prefilter.all_literals)} literals'
+                    f' ({"aho-corasick" if prefilter.automaton is not None else "substring search"}).')
+        matcher = PrefilteredMatcher(matcher, prefilter)
+    return matcher
+
+
+def pop_profile(matcher):
+    """Return (and reset) profile of matcher from `get_matcher`; None if not profiling"""
+    if isinstance(matcher, PrefilteredMatcher):
+        matcher = matcher.matcher
+    if isinstance(matcher, TimedMatcher):
+        return matcher.pop_profile()
+    return None
+
+
+def pop_quarantined(matcher):
+    """Return indices of regexes newly quarantined by matcher from `get_matcher` (see `GuardedMatcher`)"""
+    if isinstance(matcher, PrefilteredMatcher):
+        matcher = matcher.matcher
+    if isinstance(matcher, GuardedMatcher):
+        return matcher.pop_quarantined()
+    return []
@@ -6,8 +6,67 @@ from bratdb.funcs.utils import get_output_path
 from bratdb.nlp.stemmer import Stemmer
 
 
+REGEX_META = set('()[]{}?*+|^$.')
+
+
+def get_required_literal(regex):
+    """
+    Leading literal text which must occur in any match of `regex` (a regex
+    built from a single word), or '' if there is none.
+    """
+    if regex.startswith(r'\b'):
+        regex = regex[2:]
+    literal = []
+    i = 0
+    while i < len(regex):
+        c = regex[i]
+        if c == '\\':
+            if regex[i + 1:i + 2] != '.':  # escaped period (e.g., in codes) is literal
+                break
+            c = regex[i + 1]
+            i += 1
+        elif c in REGEX_META:
+            if c in '?*{' and literal:  # previous character is optional
+                literal.pop()
+            break
+        literal.append(c)
+        i += 1
+    return ''.join(literal).lower()
+
+
+def get_slop_pattern(count, sep=r'\W'):
+    r"""
+    Regex matching up to `count` words, separated (and surrounded) by `sep` characters
+
+    Equivalent to `{sep}*(\w+{sep}*){0,count}`: matches the same text, trying
+    possible ends in the same (longest first) order. Nesting each word inside the
+    previous, rather than repeating `\w+{sep}*`, prevents splitting a word across
+    repetitions, which backtracks exponentially when the following word does not
+    match (e.g., in long notes without punctuation).
+    :param count: maximum number of words
+    :param sep: regex matching a single separator character
+    """
+    pattern = ''
+    for _ in range(count):
+        pattern = rf'(?:\w+(?:{sep}+{pattern})?)?'
+    return rf'{sep}*{pattern}'
+
+
 def regexify_keywords_to_file(extract, outpath=None, encoding='utf8',
                               extra_slop=1, **kwargs):
+    """
+    Convert extracted terms into regular expressions
+
+    Writes: concept \t keywords \t regex \t required literals, where the literals
+    (space-separated) must all occur in a (lowercased) document for the regex to
+    match. These are used by `bdb-apply` to skip regexes.
+    :param extract: output of `bdb-extract`
+    :param outpath:
+    :param encoding:
+    :param extra_slop: number of words to add to each slop
+    :param kwargs:
+    :return:
+    """
     _outpath = get_output_path(extract, outpath, exts=('regexify',))
     outpath = f'{_outpath}.tsv'
     code_pat = re.compile(r'\d+\.\d+')
@@ -18,12 +77,13 @@ def regexify_keywords_to_file(extract, outpath=None, encoding='utf8',
         for line in fh:
             concept, keywords, term = line.strip().split('\t')
             words = []
+            literals = []
             prev_word = False
             terms = term.split(' ')
             for word in terms:
                 if code_pat.match(word):
                     code = word.replace('.', r'\.')
-                    regexes.append((concept, keywords, fr'\b{code}\b'))
+                    regexes.append((concept, keywords, fr'\b{code}\b', get_required_literal(code)))
                     prev_word = False
                 elif num_pat.match(word):
                     if prev_word:
@@ -32,15 +92,16 @@ def regexify_keywords_to_file(extract, outpath=None, encoding='utf8',
                         words.append(r'\d+')
                     else:
                         words.append(word)
+                        literals.append(get_required_literal(word))
                     prev_word = True
                 elif slop_pat.match(word):
                     if prev_word:
                         m = slop_pat.match(word)
                         cnt = int(m.group('slop')) + extra_slop
                         if '.' in m.group('punct') or ';' in m.group('punct'):
-                            words.append(rf'\W*(\w+\W*){{0,{cnt}}}')
+                            words.append(get_slop_pattern(cnt))
                         else:
-                            words.append(rf'[^\w\.;]*(\w+[^\w\.;]*){{0,{cnt}}}')
+                            words.append(get_slop_pattern(cnt, r'[^\w\.;]'))
                     prev_word = False
                 else:  # is word
                     if prev_word:
@@ -49,8 +110,10 @@ def regexify_keywords_to_file(extract, outpath=None, encoding='utf8',
                         words.append(Stemmer.transform(word))
                     else:
                         words.append(fr'\b{word}\b')
+                    literals.append(get_required_literal(words[-1]))
                     prev_word = True
-            regexes.append((concept, keywords, ''.join(words)))
+            if words:  # not only codes
+                regexes.append((concept, keywords, ''.join(words), ' '.join(lit for lit in literals if lit)))
 
     with open(outpath, 'w', encoding=encoding) as out:
         out.write('\n'.join('\t'.join(line) for line in regexes))
@@ -1,7 +1,11 @@
+import json
 import os
 import pathlib
 import pickle
 from collections import defaultdict
+from collections.abc import Mapping
+
+SHARD_INDEX = 'index.json'
 
 
 class BratCollection:  # TODO: make into 3.7 dataclass
@@ -29,23 +33,127 @@ class BratCollection:  # TODO: make into 3.7 dataclass
             yield name, self.annotations[name], self.sentences[name]
 
 
-def load_brat_dump(path, *, version=0):
-    if version == 0:
+class ShardedBratCollection(BratCollection):
+    """
+    Brat dump stored as a directory of shards (version 2)
+
+    Shards are only loaded when documents are accessed, and only one shard is
+    kept in memory at a time, so iterating through the collection uses
+    memory proportional to the shard size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, SHARD_INDEX), encoding='utf8') as fh:
+            self.index = json.load(fh)
+        self._shard_of = {name: i for i, shard in enumerate(self.index['shards'])
+                          for name in shard['documents']}
+        self._shard_idx = None
+        self._shard = None
+        super().__init__(annotations=_ShardView(self, 0), sentences=_ShardView(self, 1))
+
+    @property
+    def doc_count(self):
+        return self.index['doc_count']
+
+    def load_shard(self, idx):
+        """Load shard as {name: ([annotations, ...], document)}"""
+        if idx != self._shard_idx:
+            with open(os.path.join(self.path, self.index['shards'][idx]['file']), 'rb') as fh:
+                self._shard = _unpack_documents(pickle.load(fh))
+            self._shard_idx = idx
+        return self._shard
+
+    def get_document(self, name):
+        return self.load_shard(self._shard_of[name])[name]
+
+    def __iter__(self):
+        for idx in range(len(self.index['shards'])):
+            for name, (annots, sents) in self.load_shard(idx).items():
+                yield name, annots, sents
+
+
+class _ShardView(Mapping):
+    """Read-only mapping of name -> annotations/sentences of a `ShardedBratCollection`"""
+
+    def __init__(self, collection, item):
+        self.collection = collection
+        self.item = item
+
+    def __getitem__(self, name):
+        try:
+            return self.collection.get_document(name)[self.item]
+        except KeyError:
+            raise KeyError(name)
+
+    def __iter__(self):
+        return iter(self.collection._shard_of)
+
+    def __len__(self):
+        return self.collection.doc_count
+
+
+def _unpack_documents(d):
+    """Convert {name: [(annotations, sentences), ...]} to {name: ([annotations, ...], sentences)}"""
+    res = {}
+    for name in d:
+        annots = [annot for annot, sent in d[name]]
+        res[name] = (annots, d[name][-1][1])
+    return res
+
+
+def load_brat_dump(path, *, version=None):
+    """Load output of `bdb-build`
+
+    :param path: path to dump file or directory
+    :param version: version of dump; if not specified, determine from `path`
+        * 0: pickled dict of {name: [(annotations, sentences), ...]}
+        * 1: pickled `BratCollection`
+        * 2: directory of sharded version 0 dicts (see `ShardedBratCollection`)
+        * 3: directory with version 0 dict referencing a memory-mapped text store (see `textstore`)
+        * 4: SQLite database (see `sqlitedump.SqliteBratCollection`)
+    :return: BratCollection
+    """
+    if version is None:
+        if os.path.isdir(path):
+            with open(os.path.join(path, SHARD_INDEX), encoding='utf8') as fh:
+                version = json.load(fh)['version']
+        else:
+            from bratdb.sqlitedump import is_sqlite_dump
+            if is_sqlite_dump(path):
+                version = 4
+    if version is None:
         with open(path, 'rb') as fh:
             d = pickle.load(fh)
-            annots, sents = defaultdict(list), {}
-            for name in d:
-                for annot, sent in d[name]:
-                    annots[name].append(annot)
-                    sents[name] = sent
-            return BratCollection(annotations=annots, sentences=sents)
+        if isinstance(d, BratCollection):
+            return d
+        return _to_collection(d)
+    if version == 0:
+        with open(path, 'rb') as fh:
+            return _to_collection(pickle.load(fh))
     elif version == 1:
         with open(path, 'rb') as fh:
             return pickle.load(fh)
+    elif version == 2:
+        return ShardedBratCollection(path)
+    elif version == 3:
+        from bratdb.textstore import TextStore, DATA_FILE, load_data
+        return _to_collection(load_data(os.path.join(path, DATA_FILE), TextStore(path)))
+    elif version == 4:
+        from bratdb.sqlitedump import SqliteBratCollection
+        return SqliteBratCollection(path)
     else:
         raise ValueError(f'Unknown version: {version}')
 
 
+def _to_collection(d):
+    annots, sents = defaultdict(list), {}
+    for name, (annot_list, sent) in _unpack_documents(d).items():
+        annots[name] = annot_list
+        sents[name] = sent
+    return BratCollection(annotations=annots, sentences=sents)
+
+
 def get_output_path(target_path, outpath=None, exts=('txt',)):
     path, fn = os.path.split(target_path)
     fn_elements = (fn.split('.')[0],) + exts
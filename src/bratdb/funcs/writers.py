@@ -0,0 +1,224 @@
+"""
+Output writers for `bdb-apply`.
+
+Rows are buffered and written in batches. Each writer supports checkpoints: an
+offset to which the output can be truncated when resuming an interrupted run.
+    * tsv: plain text
+    * tsv.gz: gzip-compressed (a new gzip member is started after each checkpoint)
+    * tsv.zst: zstandard-compressed (requires `zstandard`; a new frame is started
+        after each checkpoint)
+    * parquet: Parquet file, one row group per batch (requires `pyarrow`); cannot
+        be resumed
+    * sqlite: SQLite database with a `matches` table
+"""
+import gzip
+import sqlite3
+from abc import ABC, abstractmethod
+
+try:
+    import zstandard
+
+    ZSTANDARD = True
+except ImportError:
+    ZSTANDARD = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    PYARROW = True
+except ImportError:
+    PYARROW = False
+
+
+class BatchWriter(ABC):
+    """Buffer rows, writing them to the output every `batch_size` rows; use as a context manager"""
+    resumable = True
+
+    def __init__(self, path, columns, *, batch_size=10000, encoding='utf8', offset=None):
+        """
+
+        :param path: output file
+        :param columns: names of columns
+        :param batch_size: number of rows to buffer before writing
+        :param encoding:
+        :param offset: if resuming, value returned by `checkpoint`; otherwise, a new
+            output file is created
+        """
+        self.path = path
+        self.columns = columns
+        self.batch_size = batch_size
+        self.encoding = encoding
+        self.rows = []
+        self._open(offset)
+
+    @abstractmethod
+    def _open(self, offset):
+        """Open output, truncating it to `offset` if resuming"""
+
+    @abstractmethod
+    def _write(self, rows):
+        """Write a batch of rows"""
+
+    @abstractmethod
+    def _checkpoint(self):
+        """Persist rows written so far, returning the offset to resume from"""
+
+    @abstractmethod
+    def _close(self):
+        """Complete and close output"""
+
+    def add(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self._write(self.rows)
+            self.rows = []
+
+    def checkpoint(self):
+        """Write all rows, returning the offset to which the output can be truncated on resume"""
+        self.flush()
+        return self._checkpoint()
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TsvWriter(BatchWriter):
+    """Write rows to tab-separated file, optionally compressed with 'gz' or 'zst'"""
+
+    def __init__(self, path, columns, *, compression=None, **kwargs):
+        if compression == 'zst' and not ZSTANDARD:
+            raise ImportError('Writing *.zst files requires `zstandard`: pip install zstandard')
+        self.compression = compression
+        self._stream = None  # current gzip member/zstandard frame
+        super().__init__(path, columns, **kwargs)
+
+    def _open(self, offset):
+        if offset is None:
+            self._out = open(self.path, 'wb')
+            self._write_bytes('\t'.join(self.columns) + '\n')
+        else:
+            self._out = open(self.path, 'r+b')
+            self._out.truncate(offset)  # discard output after checkpoint
+            self._out.seek(offset)
+
+    def _write_bytes(self, text):
+        data = text.encode(self.encoding)
+        if self.compression is None:
+            self._out.write(data)
+            return
+        if self._stream is None:
+            if self.compression == 'gz':
+                self._stream = gzip.GzipFile(fileobj=self._out, mode='wb')
+            else:
+                self._stream = zstandard.ZstdCompressor().stream_writer(self._out, closefd=False)
+        self._stream.write(data)
+
+    def _end_stream(self):
+        """Complete gzip member/zstandard frame (these can be concatenated)"""
+        if self._stream is not None:
+            if self.compression == 'gz':
+                self._stream.close()  # does not close underlying file
+            else:
+                self._stream.flush(zstandard.FLUSH_FRAME)
+            self._stream = None
+
+    def _write(self, rows):
+        self._write_bytes(''.join('\t'.join(row) + '\n' for row in rows))
+
+    def _checkpoint(self):
+        self._end_stream()
+        self._out.flush()
+        return self._out.tell()
+
+    def _close(self):
+        self._end_stream()
+        self._out.close()
+
+
+class ParquetWriter(BatchWriter):
+    """Write rows to Parquet file, with one row group per batch; columns are dictionary-encoded"""
+    resumable = False
+
+    def __init__(self, path, columns, **kwargs):
+        if not PYARROW:
+            raise ImportError('Writing Parquet files requires `pyarrow`: pip install pyarrow')
+        self.schema = pa.schema([(column, pa.dictionary(pa.int32(), pa.string())) for column in columns])
+        super().__init__(path, columns, **kwargs)
+
+    def _open(self, offset):
+        if offset is not None:
+            raise ValueError('Parquet output cannot be resumed')
+        self._writer = pq.ParquetWriter(self.path, self.schema)
+        self._count = 0
+
+    def _write(self, rows):
+        arrays = [pa.array(column, type=pa.string()).dictionary_encode() for column in zip(*rows)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self._count += len(rows)
+
+    def _checkpoint(self):
+        return self._count
+
+    def _close(self):
+        self._writer.close()
+
+
+class SqliteWriter(BatchWriter):
+    """Insert rows into the `matches` table of a SQLite database, committing at each checkpoint"""
+    TABLE = 'matches'
+
+    def _open(self, offset):
+        self._conn = sqlite3.connect(self.path)
+        if offset is None:
+            self._conn.execute(f'DROP TABLE IF EXISTS {self.TABLE}')
+            self._conn.execute(f'CREATE TABLE {self.TABLE} ({", ".join(f"{c} TEXT" for c in self.columns)})')
+        else:
+            self._conn.execute(f'DELETE FROM {self.TABLE} WHERE rowid > ?', (offset,))
+        self._conn.commit()
+        self._insert = (f'INSERT INTO {self.TABLE} ({", ".join(self.columns)})'
+                        f' VALUES ({", ".join("?" * len(self.columns))})')
+
+    def _write(self, rows):
+        self._conn.executemany(self._insert, rows)
+
+    def _checkpoint(self):
+        self._conn.commit()
+        return self._conn.execute(f'SELECT MAX(rowid) FROM {self.TABLE}').fetchone()[0] or 0
+
+    def _close(self):
+        self._conn.commit()
+        self._conn.close()
+
+
+OUTPUT_FORMATS = {
+    'tsv': (TsvWriter, {}),
+    'tsv.gz': (TsvWriter, {'compression': 'gz'}),
+    'tsv.zst': (TsvWriter, {'compression': 'zst'}),
+    'parquet': (ParquetWriter, {}),
+    'sqlite': (SqliteWriter, {}),
+}
+
+
+def get_writer_class(output_format):
+    try:
+        return OUTPUT_FORMATS[output_format][0]
+    except KeyError:
+        raise ValueError(f'Unknown output format: {output_format}')
+
+
+def get_writer(output_format, path, columns, **kwargs):
+    """Create writer for `output_format` (one of `OUTPUT_FORMATS`), see `BatchWriter`"""
+    cls, options = OUTPUT_FORMATS[output_format]
+    return cls(path, columns, **options, **kwargs)
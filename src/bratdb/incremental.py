@@ -0,0 +1,192 @@
+"""
+Update an existing brat dump, reparsing only new and modified files.
+
+The file manifest written alongside each dump (see `reader.write_file_manifest`)
+records the size, modification time, and hash of every annotation/text pair.
+Files are considered unchanged if their size and modification time match or,
+when only the modification time differs, if their hash matches.
+"""
+import glob
+import os
+import pickle
+from collections import defaultdict
+
+from loguru import logger
+
+from bratdb.reader import find_annotation_jobs, run_annotation_jobs, read_file_manifest, \
+    write_file_manifest, get_file_hash, get_file_manifest_path, read_shard_index, write_shard_index
+
+
+def find_latest_dump(outdir, dump_format='pickle'):
+    """Find most recent dump (with a file manifest) in `outdir`; None if not found"""
+    pattern = 'brat_dump_*.pkl' if dump_format == 'pickle' else 'brat_dump_*'
+    for path in sorted(glob.glob(os.path.join(outdir, pattern)), reverse=True):
+        if (os.path.isdir(path) == (dump_format == 'sharded')
+                and os.path.exists(get_file_manifest_path(path))
+                and (dump_format != 'sharded' or read_shard_index(path)['version'] == 2)):
+            return path
+    return None
+
+
+def update_brat_dump(path, ann_dir, txt_dir=None, workers=1, chunksize=None,
+                     text_manifest=True, sentence_cache=None):
+    """
+    Update dump at `path` in place, only reparsing new or modified files
+
+    Files are parsed with the same options (e.g., `word_pat`) as the original build.
+    :param path: existing pickle file or sharded dump directory
+    :param ann_dir: directory containing annotation files
+    :param txt_dir: directory containing text files (if different)
+    :param workers: number of processes to use for parsing *.ann files
+    :param chunksize: number of files to send to each worker at a time
+    :param text_manifest: if True, reuse/save index of *.txt files in `txt_dir`
+    :param sentence_cache: directory in which to cache sentence splits
+    :return: path to dump
+    """
+    txt_dir = txt_dir or ann_dir
+    old_manifest, options = read_file_manifest(path)
+    counter = defaultdict(int)
+    jobs = find_annotation_jobs(ann_dir, txt_dir, counter=counter,
+                                text_manifest=text_manifest, workers=workers)
+
+    manifest = {}
+    changed_jobs = []
+    for name, annpath, txt_path in jobs:
+        rel = os.path.relpath(annpath, ann_dir)
+        txt_rel = os.path.relpath(txt_path, txt_dir)
+        entry = old_manifest.get(rel)
+        if (entry and entry['txt'] == txt_rel
+                and _is_unchanged(entry['ann_sig'], annpath)
+                and _is_unchanged(entry['txt_sig'], txt_path)):
+            manifest[rel] = entry
+        else:
+            manifest[rel] = None  # placeholder to retain file order
+            changed_jobs.append((name, annpath, txt_path))
+    deleted = [rel for rel in old_manifest if rel not in manifest]
+    logger.info(f'Identified *.ann files: {counter["annfiles"]}')
+    logger.info(f' - missing *.txt files: {counter["missing_text"]}')
+    logger.info(f' - new or modified: {len(changed_jobs)}')
+    logger.info(f' - deleted: {len(deleted)}')
+
+    # parse new/modified files
+    parsed = {}
+    results = run_annotation_jobs(changed_jobs, workers=workers, chunksize=chunksize,
+                                  sentence_cache=sentence_cache, **options)
+    for (name, annpath, txt_path), (annotations, signatures) in zip(changed_jobs, results):
+        rel = os.path.relpath(annpath, ann_dir)
+        manifest[rel] = {
+            'name': name,
+            'txt': os.path.relpath(txt_path, txt_dir),
+            'ann_sig': signatures[0],
+            'txt_sig': signatures[1],
+            'included': bool(annotations),
+        }
+        parsed[rel] = annotations
+    affected = {manifest[rel]['name'] for rel in parsed} | {old_manifest[rel]['name'] for rel in deleted}
+
+    old_rels = _rels_by_name(old_manifest, affected, included_only=True)
+    new_rels = _rels_by_name(manifest, affected)
+
+    def rebuild(name, old_entries):
+        """Merge previous and reparsed annotations for `name`, retaining file order"""
+        previous = dict(zip(old_rels[name], old_entries or []))
+        entries = []
+        for rel in new_rels[name]:
+            if rel in parsed:
+                if parsed[rel]:
+                    entries.append(parsed[rel])
+            elif rel in previous:
+                entries.append(previous[rel])
+        return entries
+
+    if os.path.isdir(path):
+        _update_sharded_dump(path, affected, rebuild)
+    else:
+        _update_pickle_dump(path, affected, rebuild)
+    write_file_manifest(path, manifest, options=options)
+    logger.info(f'Updated {len(affected)} documents in brat dump: {path}')
+    return path
+
+
+def _rels_by_name(manifest, names, included_only=False):
+    res = defaultdict(list)
+    for rel, entry in manifest.items():
+        if entry['name'] in names and (entry['included'] or not included_only):
+            res[entry['name']].append(rel)
+    return res
+
+
+def _is_unchanged(signature, path):
+    size, mtime, digest = signature
+    st = os.stat(path)
+    if st.st_size != size:
+        return False
+    if st.st_mtime_ns == mtime:
+        return True
+    if get_file_hash(path) == digest:
+        signature[1] = st.st_mtime_ns  # only touched: avoid rehashing next time
+        return True
+    return False
+
+
+def _update_pickle_dump(path, affected, rebuild):
+    with open(path, 'rb') as fh:
+        data = pickle.load(fh)
+    for name in sorted(affected):
+        entries = rebuild(name, data.get(name))
+        if entries:
+            data[name] = entries
+        elif name in data:
+            del data[name]
+    _atomic_pickle(data, path)
+
+
+def _update_sharded_dump(path, affected, rebuild):
+    index = read_shard_index(path)
+    shard_of = {name: i for i, shard in enumerate(index['shards']) for name in shard['documents']}
+    by_shard = defaultdict(list)
+    new_shard = {}
+    for name in sorted(affected):
+        if name in shard_of:
+            by_shard[shard_of[name]].append(name)
+        else:
+            entries = rebuild(name, None)
+            if entries:
+                new_shard[name] = entries
+
+    for idx, names in by_shard.items():
+        shard_info = index['shards'][idx]
+        shard_path = os.path.join(path, shard_info['file'])
+        with open(shard_path, 'rb') as fh:
+            shard = pickle.load(fh)
+        for name in names:
+            entries = rebuild(name, shard.get(name))
+            if entries:
+                shard[name] = entries
+            else:
+                del shard[name]
+        shard_info['documents'] = list(shard)
+        if shard:
+            _atomic_pickle(shard, shard_path)
+        else:
+            os.remove(shard_path)
+
+    index['shards'] = [shard for shard in index['shards'] if shard['documents']]
+    names = list(new_shard)
+    shard_size = index.get('shard_size', 1000)
+    file_no = max((int(s['file'][6:-4]) for s in index['shards']), default=-1) + 1
+    for i in range(0, len(names), shard_size):
+        filename = f'shard_{file_no:05d}.pkl'
+        shard = {name: new_shard[name] for name in names[i:i + shard_size]}
+        _atomic_pickle(shard, os.path.join(path, filename))
+        index['shards'].append({'file': filename, 'documents': list(shard)})
+        file_no += 1
+    index['doc_count'] = sum(len(s['documents']) for s in index['shards'])
+    write_shard_index(path, index)
+
+
+def _atomic_pickle(obj, path):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as out:
+        pickle.dump(obj, out)
+    os.replace(tmp_path, path)
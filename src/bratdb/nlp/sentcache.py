@@ -0,0 +1,64 @@
+"""
+On-disk cache of sentence splits, keyed by document text and splitter.
+
+Each entry is stored in its own file (named by a hash of the splitter, its version,
+and the text), so the cache can be shared by concurrent worker processes and across
+builds. Only the length of each sentence is stored: the sentences themselves are
+sliced from the text.
+"""
+import hashlib
+import os
+import tempfile
+from array import array
+
+from bratdb.nlp.sspl import sentencebreaks_to_list, SPLITTER_VERSION
+
+
+class SentenceCache:
+
+    def __init__(self, path):
+        """
+
+        :param path: cache directory (created if it does not exist)
+        """
+        self.path = path
+
+    @staticmethod
+    def get_key(text, splitter='geniass'):
+        digest = hashlib.sha1(f'{splitter}:{SPLITTER_VERSION}:'.encode('utf8'))
+        digest.update(text.encode('utf8', errors='surrogatepass'))
+        return digest.hexdigest()
+
+    def _get_path(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def get(self, text, splitter='geniass'):
+        """Return cached list of sentences or None if not found"""
+        try:
+            with open(self._get_path(self.get_key(text, splitter)), 'rb') as fh:
+                lengths = array('I')
+                lengths.frombytes(fh.read())
+        except (OSError, ValueError):
+            return None
+        sentences = []
+        start = 0
+        for length in lengths:
+            sentences.append(text[start:start + length])
+            start += length + 1  # account for split character
+        return sentences
+
+    def set(self, text, sentences, splitter='geniass'):
+        path = self._get_path(self.get_key(text, splitter))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as out:
+            out.write(array('I', (len(sent) for sent in sentences)).tobytes())
+        os.replace(tmp_path, path)  # atomic, so concurrent writers are safe
+
+    def split(self, text, splitter='geniass'):
+        """Split `text` into sentences (see `sentencebreaks_to_list`), using the cache if possible"""
+        sentences = self.get(text, splitter)
+        if sentences is None:
+            sentences = sentencebreaks_to_list(text, splitter=splitter)
+            self.set(text, sentences, splitter)
+        return sentences
@@ -6,6 +6,7 @@ Version:    2011-05-09
 """
 from loguru import logger
 import re
+from collections import deque
 from re import compile as re_compile
 from re import DOTALL, VERBOSE
 
@@ -43,15 +44,16 @@ SENTENCE_END_NEWLINE_REGEX = re_compile(r'''
             (:?(?=\s*$))
         )
     ''', DOTALL | VERBOSE)
+NEWLINE_REGEX = re_compile(r'\n')
 
 
-def _refine_split(offsets, original_text):
+def _refine_split(offsets, original_text, refine=None, fast_newlines=False):
     # Postprocessor expects newlines, so add. Also, replace
     # sentence-internal newlines with spaces not to confuse it.
     new_text = '\n'.join((original_text[o[0]:o[1]].replace('\n', ' ')
                           for o in offsets))
 
-    output = refine_split(new_text)
+    output = (refine or refine_split)(new_text)
 
     # Align the texts and see where our offsets don't match
     old_offsets = offsets[::-1]
@@ -79,6 +81,8 @@ def _refine_split(offsets, original_text):
 
     # Finally, inject new-lines from the original document as to respect the
     #   original formatting where it is made explicit.
+    if fast_newlines:
+        return _inject_newlines(new_offsets, original_text)
     last_newline = -1
     while True:
         try:
@@ -107,6 +111,31 @@ def _refine_split(offsets, original_text):
     return new_offsets
 
 
+def _inject_newlines(offsets, original_text):
+    """Single-pass equivalent of the newline injection in `_refine_split`
+
+    Relies on offsets being non-overlapping (as they are built from consecutive matches),
+    so that each newline can only fall into (or end) one of them.
+    """
+    pending = deque(sorted(offsets))
+    new_offsets = []
+    for m in NEWLINE_REGEX.finditer(original_text):
+        orig_newline = m.start()
+        while pending and pending[0][1] < orig_newline:
+            new_offsets.append(pending.popleft())
+        if pending and pending[0][0] <= orig_newline < pending[0][1]:
+            # We need to split the existing offsets in two
+            o_start, o_end = pending.popleft()
+            new_offsets.append((o_start, orig_newline,))
+            pending.appendleft((orig_newline + 1, o_end,))
+        elif not pending or pending[0][1] != orig_newline:
+            # Stand-alone "null" sentence, just insert it
+            new_offsets.append((orig_newline, orig_newline,))
+    new_offsets.extend(pending)
+    new_offsets.sort()
+    return new_offsets
+
+
 def _sentence_boundary_gen(text, regex):
     for match in regex.finditer(text):
         yield match.span()
@@ -118,6 +147,13 @@ def regex_sentence_boundary_gen(text):
         yield o
 
 
+def fused_sentence_boundary_gen(text):
+    """Same boundaries as `regex_sentence_boundary_gen`, using `fused_refine_split`"""
+    for o in _refine_split([_o for _o in _sentence_boundary_gen(
+            text, SENTENCE_END_REGEX)], text, refine=fused_refine_split, fast_newlines=True):
+        yield o
+
+
 def newline_sentence_boundary_gen(text):
     for o in _sentence_boundary_gen(text, SENTENCE_END_NEWLINE_REGEX):
         yield o
@@ -234,6 +270,82 @@ def refine_split(s):
     return s
 
 
+# Literal text required by each of the `__initial` and `__repeated` rules: a rule
+#   cannot match (and can be skipped) unless all of these are present.
+__initial_required = [('? ',), (' . ',), ('\n',)]
+__repeated_required = [('(', ')'), ('[', ']')] * 3
+
+# Junction newlines which any of the `__final` rules might remove. Each alternative
+#   is a more permissive version of the corresponding rule (context which an earlier
+#   rule might turn from a newline into a space matches either), so the rules need
+#   only be applied around these candidates.
+__final_candidates = re.compile(r'''
+    \n(?:
+        (?<=\.\n)(?=[a-z]{3}[a-z-]*[ .:,;\n])             # lowercase word after period
+      | (?<=[A-Z]\.\n)(?=[a-z]{3}|[A-Z][a-z]{3})         # species, person names
+      | (?=(?:and|or|but|nor|yet|of|in|by|as|on|at|to|via|for|with|that|than|from|into|
+             upon|after|while|during|within|through|between|whereas|whether)[ \n])
+      | (?<=[ei]\.\n)(?=[gev]\.)                         # e.g., i.e., i.v.
+      | (?<=[egvsfr]\.\n)                                 # e.g., vs., cf., Dr., Mrs., etc.
+      | (?<=\.\n)(?=\d)                                   # approx., no., fig(s).
+      | (?=\s*,)                                          # comma
+    )''', VERBOSE)
+
+
+def fused_refine_split(s):
+    """
+    Equivalent to `refine_split`, but only applies rules where they might match.
+
+    Rules which cannot match (e.g., bracket rules without brackets in the text) are
+    skipped, and the final rules are only applied to the sentences around candidate
+    breaks identified in a single scan. As a rule can only remove a break which it
+    includes, breaks which are not candidates remain and partition the text into
+    independent parts. If the "?"/"." rules introduce new breaks, this falls back
+    to `refine_split`.
+    """
+    orig = s
+    for idx, ((r, t), required) in enumerate(zip(__initial, __initial_required)):
+        if all(req in s for req in required):
+            n = r.sub(t, s)
+            if idx < 2 and n != s:
+                # new breaks: sentences no longer align with offsets
+                return refine_split(orig)
+            s = n
+
+    for (r, t), required in zip(__repeated, __repeated_required):
+        if all(req in s for req in required):
+            while True:
+                n = r.sub(t, s)
+                if n == s:
+                    break
+                s = n
+
+    candidates = [m.start() for m in __final_candidates.finditer(s)]
+    if not candidates:
+        return s
+    parts = []
+    last = 0
+    i = 0
+    while i < len(candidates):
+        start = s.rfind('\n', 0, candidates[i]) + 1
+        end = s.find('\n', candidates[i] + 1)
+        # extend over neighbouring candidates (a rule may depend on their removal)
+        while end != -1 and i + 1 < len(candidates) and candidates[i + 1] == end:
+            i += 1
+            end = s.find('\n', end + 1)
+        if end == -1:
+            end = len(s)
+        part = s[start:end]
+        for r, t in __final:
+            part = r.sub(t, part)
+        parts.append(s[last:start])
+        parts.append(part)
+        last = end
+        i += 1
+    parts.append(s[last:])
+    return ''.join(parts)
+
+
 def _text_by_offsets_gen(text, offsets):
     for start, end in offsets:
         yield text[start:end]
@@ -244,12 +356,29 @@ def _normspace(s):
     return re.sub(r'\s', ' ', s)
 
 
-def sentencebreaks_to_list(text):
-    return sentencebreaks_to_newlines(text).split('\n')
+# Increment when changes to the rules alter the sentences produced
+#   (invalidates cached splits, see `sentcache.SentenceCache`)
+SPLITTER_VERSION = 1
+SPLITTERS = {
+    'geniass': regex_sentence_boundary_gen,
+    'fused': fused_sentence_boundary_gen,
+}
+
+
+def sentencebreaks_to_list(text, splitter='geniass'):
+    return sentencebreaks_to_newlines(text, splitter=splitter).split('\n')
 
 
-def sentencebreaks_to_newlines(text):
-    offsets = [o for o in regex_sentence_boundary_gen(text)]
+def sentencebreaks_to_newlines(text, splitter='geniass'):
+    """
+    Replace the space ending each sentence with a newline
+
+    :param text: text to split
+    :param splitter: name of sentence boundary generator in `SPLITTERS`:
+        'geniass' (regular expression rules) or 'fused' (same results, applying
+        the refinement rules only where they might match)
+    """
+    offsets = [o for o in SPLITTERS[splitter](text)]
     offsets[0] = (0, offsets[0][1])  # fix leading spaces
 
     # break into sentences
@@ -1,123 +1,487 @@
 import datetime
+import functools
+import hashlib
+import itertools
+import json
 import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pickle
 from loguru import logger
 
-from bratdb.nlp.sspl import sentencebreaks_to_list
 from bratdb.annotation import Annotation
-from bratdb.doc.sentence import Sentence
+from bratdb.doc.document import Document
+from bratdb.funcs.utils import SHARD_INDEX
+from bratdb.nlp.sentcache import SentenceCache
+from bratdb.textstore import TextStoreWriter, DATA_FILE, dump_data
+
+FILE_MANIFEST = 'manifest.json'
 
 
 class TextFinder:
     """
-    Iteratively search for text files as requested from *.ann files
+    Locate text files as requested from *.ann files
+
+    The index of name -> path is built in a single pass over `txt_dir` and, where
+    possible, persisted to a manifest file. The manifest records the modification
+    time of every directory it covers, so it is reused until a file is added to,
+    removed from, or renamed within any of those directories.
     """
+    MANIFEST_NAME = '.bratdb_index.json'
+    MANIFEST_VERSION = 1
 
-    def __init__(self, txt_dir, ignore_missing=True):
+    def __init__(self, txt_dir, ignore_missing=True, extension='.txt',
+                 use_manifest=True, manifest_path=None, workers=None):
         """
 
         :param txt_dir: directory of brat "*.txt" files
         :param ignore_missing: if False, throw error if .txt file not found
+        :param extension: only index files with this extension
+        :param use_manifest: if True, load/save the index from/to a manifest file
+        :param manifest_path: location of manifest file; defaults to `txt_dir`/.bratdb_index.json
+        :param workers: number of threads used to scan top-level directories
         """
         self.txt_dir = txt_dir
-        self.index = {}
-        self._target = None
+        self.extension = extension
         self.ignore_missing = ignore_missing
-        self._search = self._find_file()
+        self.workers = workers
+        self.manifest_path = manifest_path or os.path.join(txt_dir, self.MANIFEST_NAME)
+        self.index = None
+        if use_manifest:
+            self.index = self._load_manifest()
+        if self.index is None:
+            self.index, dir_mtimes = self._scan()
+            if use_manifest:
+                self._save_manifest(dir_mtimes)
 
     def __getitem__(self, item):
-        if item in self.index:
-            return self.index[item]
-        elif os.path.exists(os.path.join(self.txt_dir, item)):
-            return os.path.join(self.txt_dir, item)
+        try:
+            return os.path.join(self.txt_dir, self.index[item])
+        except KeyError:
+            err_msg = f'Failed to locate text file for {item}'
+            if self.ignore_missing:
+                logger.warning(err_msg)
+                return None
+            else:
+                raise FileNotFoundError(err_msg)
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def _scan(self):
+        """Build index in a single pass, scanning each top-level directory separately"""
+        index, dir_mtimes, subdirs = self._scan_directory('')
+        if self.workers and self.workers > 1 and len(subdirs) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(self._scan_tree, subdirs))
         else:
-            self._target = item
+            results = [self._scan_tree(subdir) for subdir in subdirs]
+        for sub_index, sub_mtimes in results:  # merge in sorted order so first path wins
+            for name, path in sub_index.items():
+                index.setdefault(name, path)
+            dir_mtimes.update(sub_mtimes)
+        logger.info(f'Indexed {len(index)} text files in {len(dir_mtimes)} directories.')
+        return index, dir_mtimes
+
+    def _scan_tree(self, reldir):
+        index = {}
+        dir_mtimes = {}
+        stack = [reldir]
+        while stack:
+            sub_index, sub_mtimes, subdirs = self._scan_directory(stack.pop())
+            for name, path in sub_index.items():
+                index.setdefault(name, path)
+            dir_mtimes.update(sub_mtimes)
+            stack.extend(reversed(subdirs))
+        return index, dir_mtimes
+
+    def _scan_directory(self, reldir):
+        """Scan a single directory, returning (index, {reldir: mtime}, subdirectories)"""
+        path = os.path.join(self.txt_dir, reldir)
+        index = {}
+        subdirs = []
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(os.path.join(reldir, entry.name))
+            elif entry.is_dir():  # like `os.walk`, don't follow links to directories
+                continue
+            elif entry.name.endswith(self.extension):
+                name = entry.name[:-len(self.extension)] if self.extension else os.path.splitext(entry.name)[0]
+                if name in index:
+                    logger.debug(f'Duplicate text file for {name}: {entry.path}')
+                    continue
+                index[name] = os.path.join(reldir, entry.name)
+        return index, {reldir: os.stat(path).st_mtime_ns}, subdirs
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf8') as fh:
+                manifest = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != self.MANIFEST_VERSION or manifest.get('extension') != self.extension:
+            return None
+        for reldir, mtime in manifest['directories'].items():
             try:
-                return next(self._search)
-            except StopIteration:
-                err_msg = f'Failed to locate text file for {item}'
-                if self.ignore_missing:
-                    logger.warning(err_msg)
+                if os.stat(os.path.join(self.txt_dir, reldir)).st_mtime_ns != mtime:
+                    logger.info(f'Text file manifest is out of date: {self.manifest_path}')
                     return None
-                else:
-                    raise FileNotFoundError(err_msg)
+            except OSError:
+                return None
+        logger.info(f'Loaded {len(manifest["index"])} text files from manifest: {self.manifest_path}')
+        return manifest['index']
 
-    def _find_file(self):
-        for root, dirs, files in os.walk(self.txt_dir):
-            for file in files:
-                name = os.path.splitext(file)[0]
-                if name == self._target:
-                    yield os.path.join(root, file)
-                self.index[name] = os.path.join(root, file)
+    def _save_manifest(self, dir_mtimes):
+        manifest = {
+            'version': self.MANIFEST_VERSION,
+            'extension': self.extension,
+            'directories': dir_mtimes,
+            'index': self.index,
+        }
+        try:
+            with open(self.manifest_path, 'w', encoding='utf8') as out:
+                json.dump(manifest, out)
+        except OSError as e:
+            logger.warning(f'Unable to write text file manifest to {self.manifest_path}: {e}')
+            return
+        if os.path.dirname(os.path.abspath(self.manifest_path)) == os.path.abspath(self.txt_dir):
+            # writing the manifest changed the directory's mtime
+            dir_mtimes[''] = os.stat(self.txt_dir).st_mtime_ns
+            with open(self.manifest_path, 'w', encoding='utf8') as out:
+                json.dump(manifest, out)
 
 
-def build_brat_dump(ann_dir, txt_dir, outdir='data'):
+def build_brat_dump(ann_dir, txt_dir, outdir='data', workers=1, text_manifest=True,
+                    word_pat=None, dump_format='pickle', shard_size=1000, incremental=False,
+                    defer_sentences=False, splitter='geniass', sentence_cache=None):
     """
     Dump brat data into intermediary format
     :param ann_dir:
     :param txt_dir:
     :param outdir:
-    :return:
+    :param workers: number of processes to use for parsing *.ann files
+    :param text_manifest: if True, reuse/save index of *.txt files in `txt_dir`
+    :param word_pat: regular expression identifying words (defaults to `Sentence.WORD_PAT`)
+    :param dump_format: 'pickle' for a single file, 'sharded' for a directory of
+        pickled shards which can be loaded lazily, 'mmap' for a directory with
+        all document texts in a single memory-mapped file (see `textstore`), or
+        'sqlite' for an indexed database (see `sqlitedump`)
+    :param shard_size: number of documents per shard ('sharded' only)
+    :param incremental: if True, update the most recent dump of `dump_format` in `outdir`
+        in place, only parsing new or modified files
+    :param defer_sentences: if True, store document text and only split sentences when
+        they are first accessed (useful if only annotations will be used)
+    :param splitter: sentence splitter: 'geniass' or 'fused' (same sentences, but faster)
+    :param sentence_cache: directory in which to cache sentence splits, so that duplicate
+        or unchanged documents (in this or later builds) are not split again
+    :return: path to dump
     """
     os.makedirs(outdir, exist_ok=True)
+    if incremental and dump_format not in ('pickle', 'sharded'):
+        logger.warning(f'Incremental updates are not supported for {dump_format} dumps: building new dump.')
+        incremental = False
+    if incremental:
+        from bratdb.incremental import find_latest_dump, update_brat_dump
+        path = find_latest_dump(outdir, dump_format)
+        if path:
+            return update_brat_dump(path, ann_dir, txt_dir, workers=workers,
+                                    text_manifest=text_manifest, sentence_cache=sentence_cache)
+        logger.warning(f'No existing {dump_format} dump found in {outdir}: building new dump.')
     counter = defaultdict(int)
-    data = read_brat_directory(ann_dir, txt_dir, counter=counter)
+    dt = datetime.datetime.now().strftime('%Y%m%d')
+    manifest = {}
+    options = {'word_pat': word_pat, 'defer_sentences': defer_sentences, 'splitter': splitter}
+    kwargs = dict(counter=counter, workers=workers, text_manifest=text_manifest, manifest=manifest,
+                  sentence_cache=sentence_cache, **options)
+    if dump_format == 'pickle':
+        path = os.path.join(outdir, f'brat_dump_{dt}.pkl')
+        data = read_brat_directory(ann_dir, txt_dir, **kwargs)
+        with open(path, 'wb') as fh:
+            pickle.dump(data, fh)
+    elif dump_format == 'sharded':
+        path = os.path.join(outdir, f'brat_dump_{dt}')
+        write_sharded_dump(group_by_name(iter_brat_directory(ann_dir, txt_dir, sort_by_name=True, **kwargs)),
+                           path, shard_size=shard_size, defer_sentences=defer_sentences)
+    elif dump_format == 'mmap':
+        path = os.path.join(outdir, f'brat_dump_{dt}.mmap')  # distinct from sharded dump
+        write_text_store_dump(iter_brat_directory(ann_dir, txt_dir, keep_text=True, **kwargs), path)
+    elif dump_format == 'sqlite':
+        from bratdb.sqlitedump import write_sqlite_dump
+        path = os.path.join(outdir, f'brat_dump_{dt}.db')
+        write_sqlite_dump(iter_brat_directory(ann_dir, txt_dir, **kwargs), path, options=options)
+    else:
+        raise ValueError(f'Unknown dump format: {dump_format}')
+    write_file_manifest(path, manifest, options=options)
     logger.info(f'Identified *.ann files: {counter["annfiles"]}')
     logger.info(f' - missing *.txt files: {counter["missing_text"]}')
     logger.info(f' - no annotations (possibly never reviewed): {counter["no_annotations"]}')
     total_count = counter['annfiles'] - counter['missing_text'] - counter['no_annotations']
     logger.info(f'Total annotation files added to dump: {total_count}')
-    dt = datetime.datetime.now().strftime('%Y%m%d')
-    with open(os.path.join(outdir, f'brat_dump_{dt}.pkl'), 'wb') as fh:
-        pickle.dump(data, fh)
+    logger.info(f'Brat dump written to: {path}')
+    return path
+
+
+def write_sharded_dump(items, path, shard_size=1000, defer_sentences=False):
+    """Write documents to a directory of pickled shards with an index (dump version 2)
+
+    Each shard is a dict of {name: [(annotations, document), ...]}, i.e., the
+    same structure as the single-file dump.
+
+    :param items: iterable of (name, [(annotations, document), ...])
+    :param path: output directory
+    :param shard_size: number of documents per shard
+    :param defer_sentences: flag documents as having deferred sentence splitting
+    """
+    os.makedirs(path, exist_ok=True)
+    shards = []
+    shard = {}
+
+    def write_shard():
+        filename = f'shard_{len(shards):05d}.pkl'
+        with open(os.path.join(path, filename), 'wb') as fh:
+            pickle.dump(shard, fh)
+        shards.append({'file': filename, 'documents': list(shard)})
+
+    for name, entries in items:
+        shard[name] = entries
+        if len(shard) >= shard_size:
+            write_shard()
+            shard = {}
+    if shard:
+        write_shard()
+    write_shard_index(path, {
+        'version': 2,
+        'shard_size': shard_size,
+        'defer_sentences': defer_sentences,
+        'doc_count': sum(len(s['documents']) for s in shards),
+        'shards': shards,
+    })
+
+
+def write_text_store_dump(items, path):
+    """Write documents to a directory with a memory-mapped text store (dump version 3)
+
+    Document texts are written to a single file, and the sentences, words, and
+    annotations of each document reference it by offset (see `textstore`).
+
+    :param items: iterable of (name, (annotations, document)); documents must
+        retain their text (see `Document.from_text(..., keep_text=True)`)
+    :param path: output directory
+    """
+    data = defaultdict(list)
+    with TextStoreWriter(path) as writer:
+        for name, (annotations, document) in items:
+            text = document.text
+            source = writer.add(text)
+            document.set_text_source(source)
+            for annotation in annotations.values():
+                annotation.set_text_source(source, text)
+            data[name].append((annotations, document))
+        dump_data(data, os.path.join(path, DATA_FILE), writer)
+    write_shard_index(path, {
+        'version': 3,
+        'doc_count': len(data),
+    })
+
+
+def read_shard_index(path):
+    with open(os.path.join(path, SHARD_INDEX), encoding='utf8') as fh:
+        return json.load(fh)
+
+
+def write_shard_index(path, index):
+    with open(os.path.join(path, SHARD_INDEX), 'w', encoding='utf8') as out:
+        json.dump(index, out)
+
+
+def get_file_manifest_path(path):
+    """Location of file manifest for a dump (see `write_file_manifest`)"""
+    if os.path.isdir(path):
+        return os.path.join(path, FILE_MANIFEST)
+    return f'{path}.{FILE_MANIFEST}'
+
+
+def write_file_manifest(path, manifest, options=None):
+    """Record the annotation/text files included in the dump at `path`
+
+    :param manifest: {relative ann path: {'name': name, 'txt': relative txt path,
+        'ann_sig': signature, 'txt_sig': signature, 'included': bool}};
+        see `get_file_signature` for signature
+    :param options: keyword arguments used with `create_annotations`
+    """
+    with open(get_file_manifest_path(path), 'w', encoding='utf8') as out:
+        json.dump({'version': 1, 'options': options or {}, 'files': manifest}, out)
+
+
+def read_file_manifest(path):
+    """Return (files, options) from manifest (see `write_file_manifest`)"""
+    with open(get_file_manifest_path(path), encoding='utf8') as fh:
+        manifest = json.load(fh)
+    return manifest['files'], manifest.get('options', {})
+
 
+def get_file_signature(path):
+    """Return [size, mtime_ns, sha1 hexdigest] for `path`"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, get_file_hash(path)]
 
-def read_brat_directory(ann_dir, txt_dir=None, counter=None):
+
+def get_file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def iter_annotation_files(ann_dir):
+    """Walk `ann_dir` in sorted order, yielding (name, path) for each *.ann file
+
+    Sorting ensures that the resulting dump does not depend on filesystem ordering.
+    """
+    for root, dirs, files in os.walk(ann_dir):
+        dirs.sort()
+        for file in sorted(files):
+            name, ext = os.path.splitext(file)
+            if ext != '.ann':
+                continue
+            yield name, os.path.join(root, file)
+
+
+def read_brat_directory(ann_dir, txt_dir=None, counter=None, workers=1, chunksize=None,
+                        text_manifest=True, word_pat=None, manifest=None, defer_sentences=False,
+                        splitter='geniass', sentence_cache=None, keep_text=False):
     """Read brat directory (or directories)
 
     The first layer in ann_dir will be treated as a separate abstractor.
 
     :param ann_dir: directory containing annotation files
     :param txt_dir: directory containing text files (if different)
+    :param counter: defaultdict(int) to collect statistics
+    :param workers: number of processes to parse files with; results are
+        merged in file order, so output does not depend on this value
+    :param chunksize: number of files to send to each worker at a time
+    :param text_manifest: if True, reuse/save index of *.txt files in `txt_dir`
+    :param word_pat: regular expression identifying words (defaults to `Sentence.WORD_PAT`)
+    :param manifest: if dict, record each file included (see `write_file_manifest`)
+    :param defer_sentences: if True, only split sentences when first accessed
+    :param splitter: sentence splitter (see `sspl.SPLITTERS`)
+    :param sentence_cache: directory in which to cache sentence splits
+    :param keep_text: if True, documents retain their text after splitting sentences
     :return:
     """
-    text_finder = TextFinder(txt_dir or ann_dir)
     data = defaultdict(list)
-    # if there is a 1st level, it's abstractor names
-    for root, dirs, files in os.walk(ann_dir):
-        for file in files:
-            name, ext = os.path.splitext(file)
-            if ext != '.ann':
-                continue
-            counter['annfiles'] += 1
-            txt_path = text_finder[name]
-            if not txt_path:
-                logger.error(f'Unable to locate text file for annotation "{name}"')
-                counter['missing_text'] += 1
-                continue
-            annotations = create_annotations(os.path.join(root, file), txt_path)
-            if not annotations:
-                counter['no_annotations'] += 1
-                continue
-            data[name].append(annotations)
+    for name, annotations in iter_brat_directory(ann_dir, txt_dir, counter=counter, workers=workers,
+                                                 chunksize=chunksize, text_manifest=text_manifest,
+                                                 word_pat=word_pat, manifest=manifest,
+                                                 defer_sentences=defer_sentences, splitter=splitter,
+                                                 sentence_cache=sentence_cache, keep_text=keep_text):
+        data[name].append(annotations)
     return data
 
 
-def create_annotations(annfile, txtfile):
+def iter_brat_directory(ann_dir, txt_dir=None, counter=None, workers=1, chunksize=None,
+                        text_manifest=True, word_pat=None, sort_by_name=False, manifest=None,
+                        defer_sentences=False, splitter='geniass', sentence_cache=None,
+                        keep_text=False):
+    """Iterate through (name, (annotations, document)) for each annotation file
+
+    See `read_brat_directory` for parameters.
+
+    :param sort_by_name: if True, yield results sorted by name, grouping
+        all versions of the same document together
+    """
+    if counter is None:
+        counter = defaultdict(int)
+    jobs = find_annotation_jobs(ann_dir, txt_dir, counter=counter,
+                                text_manifest=text_manifest, workers=workers)
+    if sort_by_name:
+        jobs.sort(key=lambda x: x[0])
+    results = run_annotation_jobs(jobs, workers=workers, chunksize=chunksize,
+                                  word_pat=word_pat, defer_sentences=defer_sentences,
+                                  splitter=splitter, sentence_cache=sentence_cache,
+                                  keep_text=keep_text)
+    for (name, annpath, txt_path), (annotations, signatures) in zip(jobs, results):
+        if manifest is not None:
+            manifest[os.path.relpath(annpath, ann_dir)] = {
+                'name': name,
+                'txt': os.path.relpath(txt_path, txt_dir or ann_dir),
+                'ann_sig': signatures[0],
+                'txt_sig': signatures[1],
+                'included': bool(annotations),
+            }
+        if not annotations:
+            counter['no_annotations'] += 1
+            continue
+        yield name, annotations
+
+
+def find_annotation_jobs(ann_dir, txt_dir=None, counter=None, text_manifest=True, workers=None):
+    """Find (name, annotation path, text path) for all *.ann files with a text file"""
+    if counter is None:
+        counter = defaultdict(int)
+    text_finder = TextFinder(txt_dir or ann_dir, use_manifest=text_manifest, workers=workers)
+    jobs = []
+    # if there is a 1st level, it's abstractor names
+    for name, annpath in iter_annotation_files(ann_dir):
+        counter['annfiles'] += 1
+        txt_path = text_finder[name]
+        if not txt_path:
+            logger.error(f'Unable to locate text file for annotation "{name}"')
+            counter['missing_text'] += 1
+            continue
+        jobs.append((name, annpath, txt_path))
+    return jobs
+
+
+def run_annotation_jobs(jobs, workers=1, chunksize=None, **options):
+    """Iterate through (annotations, file signatures) for each job, in order
+
+    :param options: keyword arguments passed to `create_annotations`
+    """
+    job = functools.partial(_create_annotations_job, **options)
+    if workers and workers > 1:
+        if chunksize is None:
+            chunksize = max(1, len(jobs) // (workers * 4))
+        logger.info(f'Parsing {len(jobs)} files with {workers} workers.')
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(job, jobs, chunksize=chunksize)
+    else:
+        yield from map(job, jobs)
+
+
+def group_by_name(results):
+    """Group consecutive results from `iter_brat_directory` into (name, [annotations, ...])"""
+    for name, group in itertools.groupby(results, key=lambda x: x[0]):
+        yield name, [annotations for _, annotations in group]
+
+
+def _create_annotations_job(job, **options):
+    name, annpath, txt_path = job
+    annotations = create_annotations(annpath, txt_path, **options)
+    return annotations, (get_file_signature(annpath), get_file_signature(txt_path))
+
+
+def create_annotations(annfile, txtfile, word_pat=None, defer_sentences=False, splitter='geniass',
+                       sentence_cache=None, keep_text=False):
     """
     Create annotations from brat annotation and text files
     :param annfile:
     :param txtfile:
+    :param word_pat: regular expression identifying words (defaults to `Sentence.WORD_PAT`)
+    :param defer_sentences: if True, store document text and only split sentences (and
+        assign annotations to words) when the document's sentences or an annotation's
+        words are first accessed
+    :param splitter: sentence splitter (see `sspl.SPLITTERS`)
+    :param sentence_cache: directory in which to cache sentence splits (see `SentenceCache`)
+    :param keep_text: if True, document retains its text after splitting sentences
     :return:
     """
-    with open(txtfile, encoding='utf8') as fh:
-        text = fh.read()
-    sents = []
-    char_idx = 0
-    for sent_idx, sent in enumerate(sentencebreaks_to_list(text)):
-        sents.append(Sentence(sent, sent_idx, char_idx))
-        char_idx += len(sent)
     ann_dict = defaultdict(dict)
     prev_ann = None
     with open(annfile, encoding='utf8') as fh:
@@ -137,6 +501,8 @@ def create_annotations(annfile, txtfile):
     if not ann_dict:
         logger.debug(f'No annotations found for file: {annfile}')
         return None
+    with open(txtfile, encoding='utf8') as fh:
+        text = fh.read()
 
     annotations = {}
     events = defaultdict(list)  # event_key -> (affected Ts)
@@ -171,14 +537,11 @@ def create_annotations(annfile, txtfile):
         annotations[target_key].set(label, val)
 
     # add annotations to sentences
-    for ann in annotations.values():
-        for span in ann.spans:
-            start, end = span
-            for sent in sents:
-                for word in sent.get_span(start, end):
-                    ann.words.append(word)
-                    word.add_annotation(ann)
-    return annotations, sents
+    document = Document.from_text(text, word_pat=word_pat, defer=defer_sentences, splitter=splitter,
+                                  cache=SentenceCache(sentence_cache) if sentence_cache else None,
+                                  keep_text=keep_text)
+    document.add_annotations(annotations.values())
+    return annotations, document
 
 
 def get_spans(s):
@@ -1,6 +1,7 @@
 import argparse
 
 from bratdb.funcs.apply import apply_regex_to_corpus
+from bratdb.funcs.writers import OUTPUT_FORMATS
 from bratdb.logger import initialize_logging
 
 
@@ -13,19 +14,54 @@ def main():
                         help='Directory containing files to process')
     parser.add_argument('--extension', default='.txt',
                         help='Only process files with this extension')
+    parser.add_argument('--read-threads', default=4, type=int, dest='read_threads',
+                        help='Number of threads reading files from --directory ahead of regex matching'
+                             ' (0 to read each file when needed).')
+    parser.add_argument('--prefetch', default=64, type=int,
+                        help='Maximum number of files from --directory to read ahead.')
     parser.add_argument('--connection-string', default=None, dest='connection_string',
                         help='sqlalchemy-flavored connection string')
     parser.add_argument('--outpath', default=None,
                         help='Output directory to place result.')
+    parser.add_argument('--output-format', default='tsv', choices=list(OUTPUT_FORMATS), dest='output_format',
+                        help='Format of output file: tab-separated (optionally compressed), Parquet, or SQLite.')
     parser.add_argument('--exclude-captured', default=False, action='store_true', dest='exclude_captured',
                         help='Only retain metadata; Exclude captured text as this may contain PII')
-    parser.add_argument('--run-hours', default=None, type=int, dest='run_hours',
-                        help='End program after specified hours of running.')
+    parser.add_argument('--run-hours', default=None, type=float, dest='run_hours',
+                        help='End program after specified hours of running; continue later with --resume.')
+    parser.add_argument('--resume', default=False, action='store_true',
+                        help='Continue the most recent incomplete output file (in --outpath) from its checkpoint.'
+                             ' Documents must be read in the same order (e.g., use ORDER BY in --query).')
     parser.add_argument('--logdir', default=None,
                         help='Directory to place log files. If not specified, defaults to output directory.')
     parser.add_argument('--query', default=None, nargs='+',
                         help='query to retrieve name, document_text pairs from database table;'
                              ' additional items can be included, but text must be last')
+    parser.add_argument('--fetch-size', default=1000, type=int, dest='fetch_size',
+                        help='Number of rows to fetch from the database at a time')
+    parser.add_argument('--engine', default=None, choices=('fused', 'loop'),
+                        help='"fused" joins regexes sharing a leading literal into one pattern, scanning'
+                             ' each document once per group and only matching the regexes where the'
+                             ' combined pattern matches; "loop" scans each document once per regex.'
+                             ' Both give the same results.'
+                             ' Default: "loop" when prefiltering (regex file includes literals), else "fused".')
+    parser.add_argument('--no-prefilter', dest='prefilter', action='store_false', default=True,
+                        help='Run all regexes on every document, rather than only those whose'
+                             ' required literals (from bdb-extract-build) occur in the document.')
+    parser.add_argument('--profile-regexes', default=False, action='store_true', dest='profile_regexes',
+                        help='Record time and matches of each regex, writing a report (slowest first)'
+                             ' to <output file>.profile.tsv. Regexes are run separately.')
+    parser.add_argument('--regex-timeout', default=None, type=float, dest='regex_timeout',
+                        help='Maximum seconds to run each regex on a document (requires `regex`);'
+                             ' regexes exceeding this are skipped and listed in <output file>.quarantine.tsv')
+    parser.add_argument('--dedupe', default=False, action='store_true',
+                        help='Reuse the matches of recently seen documents with identical (cleaned) text.')
+    parser.add_argument('--dedupe-cache-size', default=10000, type=int, dest='dedupe_cache_size',
+                        help='Number of recent documents to remember matches of (in each worker) with --dedupe.')
+    parser.add_argument('--workers', default=1, type=int,
+                        help='Number of processes to apply regexes with (output is identical regardless)')
+    parser.add_argument('--batch-size', default=100, type=int, dest='batch_size',
+                        help='Number of documents to send to each worker at a time')
     args = parser.parse_args()
     initialize_logging(logdir=args.logdir or args.outpath)
     apply_regex_to_corpus(**vars(args))
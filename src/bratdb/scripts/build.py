@@ -14,10 +14,38 @@ def main():
                         help='Path to output directory where brat data will be stored.')
     parser.add_argument('--logdir', default='.',
                         help='Directory to place log files.')
+    parser.add_argument('--workers', default=1, type=int,
+                        help='Number of processes to use when parsing annotation files.')
+    parser.add_argument('--no-text-manifest', default=True, action='store_false', dest='text_manifest',
+                        help='Do not read/write the cached index of text files in `txtdir`.')
+    parser.add_argument('--word-pattern', default=None, dest='word_pat',
+                        help=r'Regular expression used to identify words (default: "\w+").')
+    parser.add_argument('--format', default='pickle', choices=('pickle', 'sharded', 'mmap', 'sqlite'),
+                        dest='dump_format',
+                        help='Output a single pickle file, a directory of shards which can be loaded lazily,'
+                             ' a directory with all texts in one memory-mapped file, or a SQLite database.')
+    parser.add_argument('--shard-size', default=1000, type=int, dest='shard_size',
+                        help='Number of documents per shard (only used with `--format sharded`).')
+    parser.add_argument('--incremental', default=False, action='store_true',
+                        help='Update most recent dump in `outdir` in place, only reparsing'
+                             ' new or modified files.')
+    parser.add_argument('--defer-sentences', default=False, action='store_true', dest='defer_sentences',
+                        help='Store document text and only split sentences when first accessed;'
+                             ' faster if only annotations are needed (e.g., bdb-freq, bdb-extract).')
+    parser.add_argument('--splitter', default='geniass', choices=('geniass', 'fused'),
+                        help='Sentence splitter: "fused" produces the same sentences as the default'
+                             ' "geniass", but only applies refinement rules where they might match.')
+    parser.add_argument('--sentence-cache', default=None, dest='sentence_cache',
+                        help='Directory in which to cache sentence splits (by hash of text), so duplicate'
+                             ' or unchanged documents are only split once across builds.')
     args = parser.parse_args()
 
     initialize_logging(logdir=args.logdir)
-    build_brat_dump(args.anndir, args.txtdir, args.outdir)
+    build_brat_dump(args.anndir, args.txtdir, args.outdir, workers=args.workers,
+                    text_manifest=args.text_manifest, word_pat=args.word_pat,
+                    dump_format=args.dump_format, shard_size=args.shard_size,
+                    incremental=args.incremental, defer_sentences=args.defer_sentences,
+                    splitter=args.splitter, sentence_cache=args.sentence_cache)
 
 
 if __name__ == '__main__':
@@ -24,8 +24,10 @@ Add two fields to the output of bratdb (`bdb-apply`) -- studyid and note_date.
 ## Required
 
     * --bdb-file PATH
-        - input TSV file, the output of running `bdb-apply` on a dataset of notes
+        - input file, the output of running `bdb-apply` on a dataset of notes
         - the file should have ".apply." embedded in it (unless a different output name was chosen)
+        - any `bdb-apply --output-format` can be read: TSV (".tsv", ".tsv.gz", ".tsv.zst"),
+            Parquet (".parquet"; requires `pyarrow`), or SQLite (".sqlite")
 
 ## Optional
     * --output-dir PATH
@@ -49,9 +51,23 @@ import logging
 import os
 import pandas as pd
 import pathlib
+import sqlite3
 from loguru import logger
 
 
+def read_bdb_file(bdb_file: pathlib.Path):
+    """Read output of `bdb-apply` (any `--output-format`)"""
+    if bdb_file.suffix == '.parquet':
+        return pd.read_parquet(bdb_file)
+    elif bdb_file.suffix == '.sqlite':
+        conn = sqlite3.connect(bdb_file)
+        try:
+            return pd.read_sql('SELECT * FROM matches', conn)
+        finally:
+            conn.close()
+    return pd.read_csv(bdb_file, sep='\t', encoding='utf8')  # compression is inferred from extension
+
+
 @logger.catch
 def main(bdb_file: pathlib.Path, *, output_dir: pathlib.Path = None, corpus_file: pathlib.Path = None,
          corpus_file_doc_col='document', corpus_file_studyid_col='studyid',
@@ -61,7 +77,7 @@ def main(bdb_file: pathlib.Path, *, output_dir: pathlib.Path = None, corpus_file
     output_dir.mkdir(exist_ok=True)
     logger.info(f'Output directory: {output_dir}')
 
-    data = pd.read_csv(bdb_file, sep='\t', encoding='utf8')
+    data = read_bdb_file(bdb_file)
     data.columns = data.columns.str.lower()
     data['document'] = data['document'].astype('int64')
     in_doc_ids = set(data['document'].unique())
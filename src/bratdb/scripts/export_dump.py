@@ -0,0 +1,26 @@
+from bratdb.funcs.columnar import export_brat_dump
+from bratdb.logger import initialize_logging
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(fromfile_prefix_chars='@')
+    parser.add_argument('bratdb',
+                        help='Path to brat data dump (result of build script)')
+    parser.add_argument('--outpath', default=None,
+                        help='Output directory for Parquet files (default: alongside `bratdb`)')
+    parser.add_argument('--no-sentences', dest='include_sentences', default=True, action='store_false',
+                        help='Do not write sentences table.')
+    parser.add_argument('--batch-size', dest='batch_size', default=100_000, type=int,
+                        help='Number of rows per Parquet row group.')
+    parser.add_argument('--logdir', default='.',
+                        help='Directory to place log files.')
+    args = parser.parse_args()
+    initialize_logging(logdir=args.logdir)
+    export_brat_dump(args.bratdb, outpath=args.outpath, include_sentences=args.include_sentences,
+                     batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,11 @@ def main():
     parser.add_argument('--dont-normalize', dest='normalize', default=True, action='store_false',
                         help='Include flag to not ignore case, and various other clean-up'
                              ' operations')
+    parser.add_argument('--ignore-tags', dest='ignore_tags', default=None, nargs='+',
+                        help='Ignore specified tags/labels;'
+                             ' ignored if `keep-tags` is specified')
+    parser.add_argument('--keep-tags', dest='keep_tags', default=None, nargs='+',
+                        help='Keep only tags listed here; overrides `ignore-tags`')
     args = parser.parse_args()
     build_frequency_file(**vars(args))
 
@@ -0,0 +1,246 @@
+"""
+Store a brat dump in a SQLite database (dump version 4).
+
+Annotations (with their labels, spans, and attributes) and sentences are stored in
+indexed tables, so that label counts, term frequencies, and lookups by label,
+document, or normalized text can be run as SQL queries without loading the corpus.
+`SqliteBratCollection` reconstructs documents as they are accessed.
+"""
+import json
+import sqlite3
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+
+from bratdb.annotation import Annotation
+from bratdb.doc.document import Document
+from bratdb.doc.sentence import Sentence
+from bratdb.funcs.utils import BratCollection
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+SCHEMA = '''
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE documents (id INTEGER PRIMARY KEY, name TEXT NOT NULL, entry INTEGER NOT NULL, text TEXT);
+CREATE TABLE annotations (id INTEGER PRIMARY KEY, doc_id INTEGER NOT NULL, key TEXT NOT NULL,
+                          text TEXT, norm_text TEXT);
+CREATE TABLE labels (annotation_id INTEGER NOT NULL, label TEXT NOT NULL);
+CREATE TABLE spans (annotation_id INTEGER NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL);
+CREATE TABLE attributes (annotation_id INTEGER NOT NULL, name TEXT NOT NULL, value);
+CREATE TABLE sentences (doc_id INTEGER NOT NULL, idx INTEGER NOT NULL, start INTEGER NOT NULL, text TEXT);
+'''
+INDEXES = '''
+CREATE INDEX documents_name ON documents (name, entry);
+CREATE INDEX annotations_doc ON annotations (doc_id);
+CREATE INDEX annotations_norm_text ON annotations (norm_text);
+CREATE INDEX labels_label ON labels (label, annotation_id);
+CREATE INDEX labels_annotation ON labels (annotation_id);
+CREATE INDEX spans_annotation ON spans (annotation_id);
+CREATE INDEX attributes_annotation ON attributes (annotation_id);
+CREATE INDEX sentences_doc ON sentences (doc_id, idx);
+'''
+
+
+def normalize_text(text):
+    """Normalized form of annotation text (see `bdb-freq`)"""
+    return text.strip().lower()
+
+
+def write_sqlite_dump(items, path, options=None):
+    """Write documents to a SQLite database (dump version 4)
+
+    :param items: iterable of (name, (annotations, document))
+    :param path: output database file (replaced if it exists)
+    :param options: keyword arguments used with `create_annotations`
+    """
+    options = options or {}
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript('\n'.join(f'DROP TABLE IF EXISTS {table};' for table in (
+            'metadata', 'documents', 'annotations', 'labels', 'spans', 'attributes', 'sentences')))
+        conn.executescript(SCHEMA)
+        entries = Counter()
+        for name, (annotations, document) in items:
+            doc_id = conn.execute(
+                'INSERT INTO documents (name, entry, text) VALUES (?, ?, ?)',
+                (name, entries[name], None if document.is_split else str(document.text))
+            ).lastrowid
+            entries[name] += 1
+            if document.is_split:
+                conn.executemany('INSERT INTO sentences (doc_id, idx, start, text) VALUES (?, ?, ?, ?)',
+                                 ((doc_id, sent.idx, sent.start, sent.sentence) for sent in document))
+            for ann in annotations.values():
+                ann_id = conn.execute(
+                    'INSERT INTO annotations (doc_id, key, text, norm_text) VALUES (?, ?, ?, ?)',
+                    (doc_id, ann.key, ann.text, normalize_text(ann.text))
+                ).lastrowid
+                conn.executemany('INSERT INTO labels (annotation_id, label) VALUES (?, ?)',
+                                 ((ann_id, label) for label in ann.labels))
+                conn.executemany('INSERT INTO spans (annotation_id, start, end) VALUES (?, ?, ?)',
+                                 ((ann_id, start, end) for start, end in ann.spans))
+                conn.executemany('INSERT INTO attributes (annotation_id, name, value) VALUES (?, ?, ?)',
+                                 ((ann_id, key, value) for key, value in ann.attributes.items()))
+        conn.executescript(INDEXES)
+        conn.executemany('INSERT INTO metadata (key, value) VALUES (?, ?)', [
+            ('version', '4'),
+            ('options', json.dumps(options)),
+            ('doc_count', str(len(entries))),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def is_sqlite_dump(path):
+    with open(path, 'rb') as fh:
+        return fh.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+
+class SqliteBratCollection(BratCollection):
+    """
+    Brat dump stored in a SQLite database (version 4)
+
+    Documents are reconstructed when accessed; aggregate queries (e.g.,
+    `get_label_counts`, `get_term_frequency`) run in SQL.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        metadata = dict(self.conn.execute('SELECT key, value FROM metadata'))
+        self.options = json.loads(metadata['options'])
+        self._doc_count = int(metadata['doc_count'])
+        super().__init__(annotations=_SqliteView(self, 0), sentences=_SqliteView(self, 1))
+
+    @property
+    def doc_count(self):
+        return self._doc_count
+
+    def iter_names(self):
+        for name, in self.conn.execute('SELECT name FROM documents GROUP BY name ORDER BY MIN(id)'):
+            yield name
+
+    def get_document(self, name):
+        """Return ([annotations, ...], document) for `name`"""
+        doc_ids = [doc_id for doc_id, in self.conn.execute(
+            'SELECT id FROM documents WHERE name = ? ORDER BY entry', (name,))]
+        if not doc_ids:
+            raise KeyError(name)
+        annots = []
+        document = None
+        for doc_id in doc_ids:
+            annotations, document = self._load_document(doc_id)
+            annots.append(annotations)
+        return annots, document
+
+    def _load_annotations(self, doc_id):
+        annotations = {}
+        by_id = {}
+        for ann_id, key, text in self.conn.execute(
+                'SELECT id, key, text FROM annotations WHERE doc_id = ? ORDER BY id', (doc_id,)):
+            by_id[ann_id] = annotations[key] = Annotation(key, text=text, spans=[])
+        for table, query in [
+            ('labels', 'SELECT a.id, l.label FROM labels l JOIN annotations a ON l.annotation_id = a.id'
+                       ' WHERE a.doc_id = ? ORDER BY l.rowid'),
+            ('spans', 'SELECT a.id, s.start, s.end FROM spans s JOIN annotations a ON s.annotation_id = a.id'
+                      ' WHERE a.doc_id = ? ORDER BY s.rowid'),
+            ('attributes', 'SELECT a.id, t.name, t.value FROM attributes t'
+                           ' JOIN annotations a ON t.annotation_id = a.id WHERE a.doc_id = ? ORDER BY t.rowid'),
+        ]:
+            for ann_id, *row in self.conn.execute(query, (doc_id,)):
+                ann = by_id[ann_id]
+                if table == 'labels':
+                    ann.labels[row[0]] = ()
+                elif table == 'spans':
+                    ann.spans.append(tuple(row))
+                else:
+                    ann.set(*row)
+        return annotations
+
+    def _load_document(self, doc_id):
+        word_pat = self.options.get('word_pat')
+        splitter = self.options.get('splitter', 'geniass')
+        text, = self.conn.execute('SELECT text FROM documents WHERE id = ?', (doc_id,)).fetchone()
+        if text is not None:  # sentences not yet split
+            document = Document(text=text, word_pat=word_pat, splitter=splitter)
+        else:
+            document = Document([
+                Sentence(sentence, idx, start, word_pat=word_pat)
+                for idx, start, sentence in self.conn.execute(
+                    'SELECT idx, start, text FROM sentences WHERE doc_id = ? ORDER BY idx', (doc_id,))
+            ], word_pat=word_pat, splitter=splitter)
+        annotations = self._load_annotations(doc_id)
+        document.add_annotations(annotations.values())
+        return annotations, document
+
+    def __iter__(self):
+        for name in self.iter_names():
+            annots, document = self.get_document(name)
+            yield name, annots, document
+
+    def get_label_counts(self):
+        """Number of annotations with each label"""
+        return dict(self.conn.execute('SELECT label, COUNT(*) FROM labels GROUP BY label'))
+
+    def find_annotations(self, *, label=None, text=None):
+        """Find (document name, annotation key) of annotations by label and/or normalized text"""
+        query = ('SELECT DISTINCT d.name, a.key FROM annotations a JOIN documents d ON a.doc_id = d.id'
+                 ' JOIN labels l ON l.annotation_id = a.id WHERE 1 = 1')
+        params = []
+        if label is not None:
+            query += ' AND l.label = ?'
+            params.append(label)
+        if text is not None:
+            query += ' AND a.norm_text = ?'
+            params.append(normalize_text(text))
+        return self.conn.execute(query + ' ORDER BY a.id', params).fetchall()
+
+    def get_term_frequency(self, *, once_per_document=True, max_length=80, normalize=True,
+                           keep_tags=None, ignore_tags=None):
+        """Frequency of annotation text by label (see `frequency.get_frequency`)"""
+        text_col = 'a.norm_text' if normalize else 'a.text'
+        query = (f'SELECT l.label, {text_col}, COUNT(*) FROM annotations a'
+                 f' JOIN labels l ON l.annotation_id = a.id')
+        params = []
+        if once_per_document:  # select the most complete version of each document
+            query += ''' WHERE a.doc_id IN (
+                SELECT id FROM (
+                    SELECT d.id, ROW_NUMBER() OVER (
+                        PARTITION BY d.name ORDER BY COUNT(a2.id) DESC, d.entry) AS rank
+                    FROM documents d LEFT JOIN annotations a2 ON a2.doc_id = d.id
+                    GROUP BY d.id
+                ) WHERE rank = 1
+            )'''
+        else:
+            query += ' WHERE 1 = 1'
+        if keep_tags:
+            query += f' AND l.label IN ({", ".join("?" * len(keep_tags))})'
+            params.extend(keep_tags)
+        elif ignore_tags:
+            query += f' AND l.label NOT IN ({", ".join("?" * len(ignore_tags))})'
+            params.extend(ignore_tags)
+        counter = defaultdict(Counter)
+        for label, text, count in self.conn.execute(query + f' GROUP BY l.label, {text_col}', params):
+            if not normalize:
+                text = text.strip()
+            counter[label][text[:max_length]] += count
+        return counter
+
+    def close(self):
+        self.conn.close()
+
+
+class _SqliteView(Mapping):
+    """Read-only mapping of name -> annotations/sentences of a `SqliteBratCollection`"""
+
+    def __init__(self, collection, item):
+        self.collection = collection
+        self.item = item
+
+    def __getitem__(self, name):
+        return self.collection.get_document(name)[self.item]
+
+    def __iter__(self):
+        return self.collection.iter_names()
+
+    def __len__(self):
+        return self.collection.doc_count
@@ -0,0 +1,148 @@
+"""
+Store the text of all documents in a single contiguous UTF-8 file.
+
+The file is read via `mmap`, so opening a store is near-instant and its pages are
+shared (through the page cache) by all processes reading the same dump. Sentences,
+words, and annotations reference a document's `StoredText` by offset, and text is
+only decoded when accessed.
+
+Dump layout (version 3):
+    index.json: {'version': 3, 'doc_count': ...}
+    texts.utf8: concatenated document texts
+    texts.idx: byte offset of each document (and the end), followed by the character
+        length of each document (array of unsigned 64-bit ints)
+    data.pkl: {name: [(annotations, document), ...]}, referencing the text store
+"""
+import functools
+import mmap
+import os
+import pickle
+from array import array
+
+TEXT_FILE = 'texts.utf8'
+TEXT_INDEX = 'texts.idx'
+DATA_FILE = 'data.pkl'
+STORE_ID = 'texts'  # pickle persistent id of the text store
+
+
+class TextStore:
+    """Read-only store of document texts in an `mmap`'d file"""
+
+    def __init__(self, path):
+        """
+
+        :param path: dump directory containing `TEXT_FILE` and `TEXT_INDEX`
+        """
+        self.path = path
+        index = array('Q')
+        with open(os.path.join(path, TEXT_INDEX), 'rb') as fh:
+            index.frombytes(fh.read())
+        n = (len(index) - 1) // 2
+        self._byte_offsets = index[:n + 1]
+        self._char_lengths = index[n + 1:]
+        with open(os.path.join(path, TEXT_FILE), 'rb') as fh:
+            if self._byte_offsets[-1]:
+                self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            else:  # cannot map an empty file
+                self._data = b''
+        self.get_text = functools.lru_cache(maxsize=8)(self._get_text)
+
+    def __len__(self):
+        return len(self._char_lengths)
+
+    def _get_text(self, doc_id):
+        start, end = self._byte_offsets[doc_id], self._byte_offsets[doc_id + 1]
+        return self._data[start:end].decode('utf8')
+
+    def get_slice(self, doc_id, start, end):
+        """Text of characters [start, end) of document"""
+        offset = self._byte_offsets[doc_id]
+        length = self._char_lengths[doc_id]
+        if self._byte_offsets[doc_id + 1] - offset == length:  # ascii: bytes are characters
+            start, end, _ = slice(start, end).indices(length)
+            return self._data[offset + start:offset + max(start, end)].decode('utf8')
+        return self.get_text(doc_id)[start:end]
+
+    def get_length(self, doc_id):
+        return self._char_lengths[doc_id]
+
+
+class TextStoreWriter:
+    """Append document texts to a new text store; use as a context manager"""
+
+    def __init__(self, path):
+        self.path = path
+        self._byte_offsets = array('Q', [0])
+        self._char_lengths = array('Q')
+        self._out = None
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._out = open(os.path.join(self.path, TEXT_FILE), 'wb')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._out.close()
+        with open(os.path.join(self.path, TEXT_INDEX), 'wb') as out:
+            out.write(self._byte_offsets.tobytes())
+            out.write(self._char_lengths.tobytes())
+
+    def __len__(self):
+        return len(self._char_lengths)
+
+    def add(self, text):
+        """Add text of document, returning its `StoredText`"""
+        data = text.encode('utf8')
+        self._out.write(data)
+        self._byte_offsets.append(self._byte_offsets[-1] + len(data))
+        self._char_lengths.append(len(text))
+        return StoredText(self, len(self._char_lengths) - 1)
+
+
+class StoredText:
+    """
+    Reference to the text of a document in a `TextStore`
+
+    Slicing returns a `str`.
+    """
+    __slots__ = ('store', 'doc_id')
+
+    def __init__(self, store, doc_id):
+        self.store = store
+        self.doc_id = doc_id
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step not in (None, 1):
+            return str(self)[item]
+        return self.store.get_slice(self.doc_id, item.start, item.stop)
+
+    def __len__(self):
+        return self.store.get_length(self.doc_id)
+
+    def __str__(self):
+        return self.store.get_text(self.doc_id)
+
+    def __repr__(self):
+        return f'StoredText({self.doc_id})'
+
+
+def dump_data(data, path, store):
+    """Pickle `data` to `path`, storing references to `store` (a `TextStore` or `TextStoreWriter`)"""
+    with open(path, 'wb') as fh:
+        pickler = pickle.Pickler(fh)
+        pickler.persistent_id = lambda obj: STORE_ID if obj is store else None
+        pickler.dump(data)
+
+
+def load_data(path, store):
+    """Unpickle `data` from `path`, resolving references to `store` (see `dump_data`)"""
+    with open(path, 'rb') as fh:
+        unpickler = pickle.Unpickler(fh)
+
+        def persistent_load(pid):
+            if pid != STORE_ID:
+                raise pickle.UnpicklingError(f'Unknown persistent id: {pid}')
+            return store
+
+        unpickler.persistent_load = persistent_load
+        return unpickler.load()
@@ -0,0 +1,33 @@
+import pytest
+
+DOCUMENTS = {
+    'doc1': (
+        'The patient was seen today. She reports feeling depressed.\n'
+        'No chest pain. Follow up in 2 weeks.\n',
+        'T1\tSymptom 48 57\tdepressed\n'
+        'T2\tSymptom 62 72\tchest pain\n'
+        'A1\tNegated T2\n'
+    ),
+    'doc2': (
+        'History of anxiety (treated with sertraline).\nDenies suicidal ideation.\n',
+        'T1\tSymptom 11 18\tanxiety\n'
+        'T2\tMedication 33 43\tsertraline\n'
+        'T3\tSymptom 53 70\tsuicidal ideation\n'
+        'A1\tNegated T3\n'
+    ),
+    'doc3': (
+        'Unremarkable visit.\n',
+        '',
+    ),
+}
+
+
+@pytest.fixture
+def brat_dir(tmp_path):
+    """Small brat directory with *.ann and *.txt files side-by-side"""
+    path = tmp_path / 'brat'
+    path.mkdir()
+    for name, (text, ann) in DOCUMENTS.items():
+        (path / f'{name}.txt').write_text(text, encoding='utf8')
+        (path / f'{name}.ann').write_text(ann, encoding='utf8')
+    return path
@@ -0,0 +1,233 @@
+import re
+
+import pytest
+
+from bratdb.funcs.apply import apply_regexes_to_text, compile_regexes, apply_regex_to_corpus, get_documents, \
+    read_checkpoint, MatchCache, _apply_regexes_to_batch, apply_regex_to_df
+from bratdb.funcs.matchers import FusedMatcher, get_matcher
+from bratdb.funcs.regexify import regexify_keywords_to_file
+
+PATTERNS = [
+    r'\bpain\b', r'\bpa(in|ins)\b', r'pains?', r'\bpalp\w*', r'nause\w*\W*vomit\w*',
+    r'\bno\b\W*[^\w\.;]*(\w+[^\w\.;]*){0,2}pain', r'(\w+) \1', r'^the', r'the$', r'\d+',
+    r'sp(i|a)n', r'spin|pain', r'(?i)Pain', r'n', r'\bn\b', r'p\w*n', r'\bp(?=ain)',
+]
+TEXT = 'No back pain but pains and palpitations; nausea, then vomiting. Spin spin 10 mg. pa pa n the'
+
+
+@pytest.fixture
+def regexes():
+    return [(f'c{i}', f't{i}', re.compile(p, re.IGNORECASE)) for i, p in enumerate(PATTERNS)]
+
+
+def test_fused_matches_loop(regexes):
+    expected = list(apply_regexes_to_text(regexes, TEXT, include_context=5))
+    assert list(apply_regexes_to_text(get_matcher(regexes, 'fused'), TEXT, include_context=5)) == expected
+
+
+def test_fused_groups_by_prefix(regexes):
+    matcher = FusedMatcher(regexes)
+    fused = {idx for _, indices in matcher.groups for idx in indices}
+    assert {0, 1, 3, 16} <= fused  # \bp...
+    assert 6 in matcher.unfused  # backreference
+    assert 11 in matcher.unfused  # top-level alternation
+    assert 12 in matcher.unfused  # inline flag
+    assert 9 in matcher.unfused  # no leading literal
+
+
+@pytest.mark.parametrize('use_automaton', [True, False])
+@pytest.mark.parametrize('engine', ['fused', 'loop'])
+def test_prefilter_matches_loop(tmp_path, engine, use_automaton):
+    extract = tmp_path / 'terms.extract.tsv'
+    extract.write_text('\n'.join([
+        'pain\tback pain\tback pain',
+        'pain\tpains\tpains',
+        'gi\tnausea vomiting\tnausea [W2<|,|>] vomiting',
+        'gi\tspin\tspin',
+        'dose\tmg\t10 mg',
+        'code\t250.00\t250.00',
+        'cardiac\tpalpitations\tpalpitations',
+        'sleep\tinsomnia\tinsomnia',
+    ]), encoding='utf8')
+    regexify_keywords_to_file(str(extract), outpath=str(tmp_path))
+    regexes, literals = compile_regexes(str(tmp_path / 'terms.regexify.tsv'), with_literals=True)
+    assert literals[0] == ('back', 'pain')
+    matcher = get_matcher(regexes, engine, literals)
+    if not use_automaton:
+        matcher.prefilter.automaton = None
+    for text in [TEXT, TEXT.upper(), 'ICD 250.00: PAINſ, back paın', 'nothing']:
+        assert list(apply_regexes_to_text(matcher, text)) == list(apply_regexes_to_text(regexes, text))
+    assert matcher.prefilter.get_active('nothing') == set()
+
+
+@pytest.mark.parametrize(('pattern', 'literals', 'text'), [
+    (r'\bµg\b', ('µg',), '5 μg daily'),
+    (r'\bμg\b', ('μg',), '5 µg daily'),
+    (r'πανικοσ', ('πανικοσ',), 'πανικος'),
+    (r'10 µg', ('10', 'µg'), '10 μg'),
+])
+def test_prefilter_non_ascii_literals(pattern, literals, text):
+    regexes = [('c', 't', re.compile(pattern, re.IGNORECASE))]
+    assert len(list(apply_regexes_to_text(regexes, text))) == 1
+    matcher = get_matcher(regexes, literals=[literals])
+    assert list(apply_regexes_to_text(matcher, text)) == list(apply_regexes_to_text(regexes, text))
+
+
+def test_default_engine(regexes):
+    assert isinstance(get_matcher(regexes), FusedMatcher)
+    literals = [('pain',)] * len(regexes)
+    assert get_matcher(regexes, literals=literals).matcher is regexes  # loop when prefiltering
+    assert isinstance(get_matcher(regexes, 'fused', literals).matcher, FusedMatcher)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Regex file and directory of documents"""
+    regex_file = tmp_path / 'terms.regexify.tsv'
+    regex_file.write_text('\n'.join(f'c{i}\tt{i}\t{p}' for i, p in enumerate(PATTERNS)), encoding='utf8')
+    corpus = tmp_path / 'corpus'
+    corpus.mkdir()
+    for i in range(25):
+        (corpus / f'doc{i}.txt').write_text(TEXT[i:] + '\n' + TEXT[:i], encoding='utf8')
+    return regex_file, corpus
+
+
+def test_apply_regex_to_corpus_workers(tmp_path, corpus):
+    regex_file, corpus = corpus
+    results = []
+    for workers in (1, 2):
+        outdir = tmp_path / f'out{workers}'
+        outdir.mkdir()
+        outpath = apply_regex_to_corpus(str(regex_file), outpath=str(outdir), directory=str(corpus),
+                                        workers=workers, batch_size=4, log_incr=10)
+        with open(outpath, encoding='utf8') as fh:
+            results.append(fh.read())
+    assert results[0].count('\n') > 25
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_apply_regex_to_corpus_dedupe(tmp_path, corpus, workers):
+    regex_file, corpus = corpus
+    for i in range(10):  # duplicates of earlier documents
+        (corpus / f'dup{i}.txt').write_text(TEXT[i:] + '\n' + TEXT[:i], encoding='utf8')
+    results = []
+    for dedupe in (False, True):
+        outdir = tmp_path / f'out{dedupe}'
+        outdir.mkdir()
+        outpath = apply_regex_to_corpus(str(regex_file), outpath=str(outdir), directory=str(corpus),
+                                        workers=workers, batch_size=4, dedupe=dedupe, dedupe_cache_size=5)
+        with open(outpath, encoding='utf8') as fh:
+            results.append(fh.read())
+    assert results[0] == results[1]
+
+
+def test_match_cache_skips_duplicates(regexes):
+    cache = MatchCache(maxsize=2)
+    batch = [('a', TEXT), ('b', 'pain'), ('c', TEXT), ('d', 'spin'), ('e', 'n'), ('f', TEXT)]
+    result = _apply_regexes_to_batch(batch, regexes, cache)
+    assert result.skipped == 1  # 'f' no longer cached
+    expected = _apply_regexes_to_batch(batch, regexes)
+    assert result.rows == expected.rows
+    assert expected.skipped == 0
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_apply_regex_to_df(corpus, regexes, workers):
+    pd = pytest.importorskip('pandas')
+    regex_file, _ = corpus
+    texts = [TEXT[i:] + '\n' + TEXT[:i] for i in range(25)] + [None]
+    df = pd.DataFrame({'text': texts}, index=range(100, 126))
+    expected = [(100 + i, *match) for i, text in enumerate(texts[:-1])
+                for match in apply_regexes_to_text(regexes, text, include_context=10)]
+    result = apply_regex_to_df(str(regex_file), df, text_col='text', include_context=10,
+                               workers=workers, batch_size=4)
+    assert list(result.columns) == ['id', 'concept', 'term', 'capture', 'precontext', 'postcontext']
+    assert isinstance(result['concept'].dtype, pd.CategoricalDtype)
+    assert list(result.itertuples(index=False, name=None)) == expected
+    assert apply_regex_to_df(str(regex_file), df, text_col='text', include_context=10,
+                             as_dataframe=False) == expected
+
+
+@pytest.mark.parametrize('prefetch', [1, 3, 100])
+def test_get_documents_prefetch(corpus, prefetch):
+    _, corpus = corpus
+    expected = list(get_documents(directory=str(corpus), read_threads=0))
+    assert len(expected) == 25
+    assert list(get_documents(directory=str(corpus), read_threads=2, prefetch=prefetch)) == expected
+    documents = get_documents(directory=str(corpus), read_threads=2, prefetch=prefetch)
+    assert next(documents) == expected[0]
+    documents.close()  # stop early
+
+
+def test_get_documents_from_database(tmp_path):
+    sqla = pytest.importorskip('sqlalchemy')
+    connection_string = f'sqlite:///{tmp_path / "notes.db"}'
+    with sqla.create_engine(connection_string).begin() as conn:
+        conn.execute(sqla.text('CREATE TABLE notes (id INTEGER, part INTEGER, note_text TEXT)'))
+        conn.execute(sqla.text('INSERT INTO notes VALUES (:id, :part, :text)'),
+                     [{'id': i, 'part': i % 2, 'text': f'note {i}'} for i in range(25)])
+    documents = list(get_documents(connection_string=connection_string,
+                                   query=['SELECT id, part, note_text', 'FROM notes ORDER BY id'],
+                                   fetch_size=4))
+    assert documents == [(f'{i},{i % 2}', f'note {i}') for i in range(25)]
+
+
+def test_apply_regex_to_corpus_resume(tmp_path, corpus):
+    regex_file, corpus = corpus
+    expected = apply_regex_to_corpus(str(regex_file), outpath=str(tmp_path), directory=str(corpus))
+    outdir = tmp_path / 'out'
+    outdir.mkdir()
+    # stops after first batch
+    outpath = apply_regex_to_corpus(str(regex_file), outpath=str(outdir), directory=str(corpus),
+                                    batch_size=4, run_hours=1e-12)
+    assert read_checkpoint(outpath)['documents'] == 4
+    assert not read_checkpoint(outpath)['completed']
+    with open(outpath, 'a', encoding='utf8') as out:  # output written after checkpoint, before a crash
+        out.write('doc5\tpartial')
+    resumed = apply_regex_to_corpus(str(regex_file), outpath=str(outdir), directory=str(corpus),
+                                    batch_size=4, resume=True)
+    assert resumed == outpath
+    assert read_checkpoint(outpath)['completed']
+    with open(expected, encoding='utf8') as fh1, open(outpath, encoding='utf8') as fh2:
+        assert fh1.read() == fh2.read()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_apply_regex_to_corpus_profile(tmp_path, corpus, workers):
+    regex_file, corpus = corpus
+    expected = apply_regex_to_corpus(str(regex_file), outpath=str(tmp_path), directory=str(corpus))
+    outdir = tmp_path / 'out'
+    outdir.mkdir()
+    outpath = apply_regex_to_corpus(str(regex_file), outpath=str(outdir), directory=str(corpus),
+                                    profile_regexes=True, workers=workers, batch_size=4)
+    with open(expected, encoding='utf8') as fh1, open(outpath, encoding='utf8') as fh2:
+        assert fh1.read() == fh2.read()
+    with open(f'{outpath}.profile.tsv', encoding='utf8') as fh:
+        header, *lines = fh.read().splitlines()
+    rows = {line.split('\t')[2]: line.split('\t') for line in lines}
+    assert len(rows) == len(PATTERNS)
+    counts = [len(re.findall(r'\bpain\b', text)) for _, text in get_documents(directory=str(corpus))]
+    # documents, matched documents, matches
+    assert rows[r'\bpain\b'][6:] == ['25', str(sum(1 for c in counts if c)), str(sum(counts))]
+
+
+def test_guarded_matches_loop(regexes):
+    pytest.importorskip('regex')
+    matcher = get_matcher(regexes, timeout=1)
+    assert list(apply_regexes_to_text(matcher, TEXT)) == list(apply_regexes_to_text(regexes, TEXT))
+    assert not matcher.quarantined
+
+
+def test_apply_regex_to_corpus_quarantine(tmp_path, corpus):
+    pytest.importorskip('regex')
+    regex_file, corpus = corpus
+    (corpus / 'doc_slow.txt').write_text('a' * 40, encoding='utf8')
+    with open(regex_file, 'a', encoding='utf8') as out:
+        out.write('\nslow\tslow\t(a|aa)+c')  # catastrophic backtracking
+    outpath = apply_regex_to_corpus(str(regex_file), outpath=str(tmp_path), directory=str(corpus),
+                                    regex_timeout=0.05)
+    assert read_checkpoint(outpath)['completed']
+    with open(f'{outpath}.quarantine.tsv', encoding='utf8') as fh:
+        header, *lines = fh.read().splitlines()
+    assert [line.split('\t')[:4] for line in lines] == [['slow', 'slow', '(a|aa)+c', 'doc_slow']]
@@ -0,0 +1,18 @@
+import pytest
+
+from bratdb.funcs.columnar import export_brat_dump
+from bratdb.reader import build_brat_dump
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def test_export_brat_dump(brat_dir, tmp_path):
+    path = build_brat_dump(str(brat_dir), None, str(tmp_path / 'dump'))
+    outpath = export_brat_dump(path, outpath=str(tmp_path / 'parquet'), batch_size=2)
+    annotations = pq.read_table(f'{outpath}/annotations.parquet')
+    assert annotations.num_rows == 5
+    assert annotations.schema.field('label').type.value_type == 'string'
+    assert sorted(annotations.column('text').to_pylist())[0] == 'anxiety'
+    attributes = pq.read_table(f'{outpath}/attributes.parquet').to_pylist()
+    assert {(row['document'], row['key']) for row in attributes} == {('doc1', 'T2'), ('doc2', 'T3')}
+    assert pq.read_table(f'{outpath}/sentences.parquet', columns=['text']).num_rows > 0
@@ -0,0 +1,75 @@
+import pickle
+
+import pytest
+
+from bratdb.annotation import Annotation
+from bratdb.doc.document import Document
+from bratdb.doc.sentence import Sentence
+from bratdb.doc.word import Word
+
+TEXT = ('Patient reports feeling depressed. No chest pain.\n'
+        'Follow up in 2 weeks (or sooner).\n\nSigned.')
+
+
+@pytest.fixture
+def document():
+    return Document.from_text(TEXT)
+
+
+def test_words_match_text(document):
+    for sent in document:
+        assert TEXT[sent.start:sent.end] == sent.sentence
+        for word in sent.words:
+            assert TEXT[word.start:word.end] == word.word
+
+
+@pytest.mark.parametrize(('start', 'end'), [
+    (0, len(TEXT)),
+    (24, 33),
+    (30, 45),
+    (33, 35),
+    (49, 52),
+    (len(TEXT) - 3, len(TEXT) + 10),
+])
+def test_words_in_span(document, start, end):
+    expected = [word for sent in document for word in sent.words
+                if word.start < end and word.end > start]
+    assert list(document.words_in_span(start, end)) == expected
+
+
+def test_word_pattern():
+    document = Document.from_text(TEXT, word_pat=r'\S+')
+    assert [word.word for word in document[0].words] == ['Patient', 'reports', 'feeling', 'depressed.']
+
+
+def test_word_annotations(document):
+    word = next(document.words_in_span(24, 33))
+    assert word.annotations == []
+    word.add_annotation('ann')
+    assert document[0].get_word(3).annotations == ['ann']
+
+
+def test_baseline_sentence_state():
+    """Baseline sentences were pickled with a list of `Word` objects"""
+    words = []
+    for idx, (text, start) in enumerate([('no', 10), ('pain', 13)]):
+        word = Word.__new__(Word)
+        word.__setstate__({'word': text, 'start': start, 'end': 0, 'word_idx': idx, 'sent_idx': 1,
+                           '_annotations': ['ann'] if idx else []})
+        words.append(word)
+    sent = Sentence.__new__(Sentence)
+    sent.__setstate__({'sentence': 'no pain.', 'idx': 1, 'start': 10, 'end': 18, 'words': words})
+    assert [(word.word, word.start, word.end) for word in sent.words] == [('no', 10, 12), ('pain', 13, 17)]
+    assert words[1] == sent.get_word(1)
+    assert sent.get_word(1).annotations == ['ann']
+    sent = pickle.loads(pickle.dumps(sent))
+    assert sent.sentence == 'no pain.'
+    assert [word.word for word in sent.words_in_span(12, 18)] == ['pain']
+
+
+def test_annotation_attributes():
+    ann = Annotation('T1', text='pain', spans=[(44, 48)], labels=['Symptom'])
+    assert ann.attributes == {}
+    ann.attributes['Negated'] = 1
+    ann.set('Historical', 1)
+    assert ann.attributes == {'Negated': 1, 'Historical': 1}
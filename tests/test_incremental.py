@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+import bratdb.reader
+from bratdb.funcs.utils import load_brat_dump
+from bratdb.reader import build_brat_dump, read_file_manifest
+
+
+def _summarize(path):
+    return {
+        name: [sorted((key, ann.text, tuple(ann.labels)) for key, ann in annot.items()) for annot in annots]
+        for name, annots, sents in load_brat_dump(path)
+    }
+
+
+@pytest.mark.parametrize('dump_format', ['pickle', 'sharded'])
+def test_incremental_build(brat_dir, tmp_path, dump_format, monkeypatch):
+    outdir = str(tmp_path / 'out')
+    path = build_brat_dump(str(brat_dir), None, outdir, dump_format=dump_format, shard_size=1)
+    # modify, add, delete, and touch files
+    (brat_dir / 'doc1.ann').write_text('T1\tSymptom 48 57\tdepressed\n')
+    (brat_dir / 'doc4.txt').write_text('Feeling anxious.\n')
+    (brat_dir / 'doc4.ann').write_text('T1\tSymptom 8 15\tanxious\n')
+    (brat_dir / 'doc2.ann').unlink()
+    os.utime(brat_dir / 'doc3.txt', ns=(0, 0))
+
+    parsed = []
+    create_annotations = bratdb.reader.create_annotations
+
+    def record(annfile, *args, **kwargs):
+        parsed.append(os.path.basename(annfile))
+        return create_annotations(annfile, *args, **kwargs)
+
+    monkeypatch.setattr(bratdb.reader, 'create_annotations', record)
+    assert build_brat_dump(str(brat_dir), None, outdir, dump_format=dump_format,
+                           incremental=True) == path
+    assert sorted(parsed) == ['doc1.ann', 'doc4.ann']
+    assert set(read_file_manifest(path)[0]) == {'doc1.ann', 'doc3.ann', 'doc4.ann'}
+
+    expected = build_brat_dump(str(brat_dir), None, str(tmp_path / 'expected'), dump_format=dump_format)
+    assert _summarize(path) == _summarize(expected)
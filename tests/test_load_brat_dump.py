@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from bratdb.funcs.extract import get_keywords
+from bratdb.funcs.frequency import get_frequency
+from bratdb.funcs.info import get_brat_info
+from bratdb.funcs.utils import load_brat_dump, ShardedBratCollection
+from bratdb.reader import build_brat_dump
+
+# dump of `conftest.DOCUMENTS` (with *.ann and *.txt files in separate directories) written
+# by `bdb-build` before the document model used `__slots__`
+BASELINE_DUMP = os.path.join(os.path.dirname(__file__), 'data', 'brat_dump_baseline.pkl')
+
+
+def _summarize(brat):
+    return [
+        (name, [sorted((key, ann.text, tuple(ann.labels)) for key, ann in annot.items()) for annot in annots],
+         [sent.sentence for sent in sents])
+        for name, annots, sents in brat
+    ]
+
+
+@pytest.fixture
+def pickle_dump(brat_dir, tmp_path):
+    return build_brat_dump(str(brat_dir), None, str(tmp_path / 'pickle'))
+
+
+@pytest.fixture
+def sharded_dump(brat_dir, tmp_path):
+    return build_brat_dump(str(brat_dir), None, str(tmp_path / 'sharded'),
+                           dump_format='sharded', shard_size=1)
+
+
+def test_sharded_dump(pickle_dump, sharded_dump):
+    brat = load_brat_dump(sharded_dump)
+    assert isinstance(brat, ShardedBratCollection)
+    assert brat.doc_count == 2
+    assert _summarize(brat) == _summarize(load_brat_dump(pickle_dump))
+    assert brat.annots['doc2'][0]['T2'].text == 'sertraline'
+    with pytest.raises(KeyError):
+        brat.annots['doc3']
+
+
+def test_sharded_dump_funcs(pickle_dump, sharded_dump):
+    assert get_frequency(sharded_dump) == get_frequency(pickle_dump)
+    assert get_brat_info(sharded_dump) == get_brat_info(pickle_dump)
+
+
+def test_mmap_dump(pickle_dump, brat_dir, tmp_path):
+    path = build_brat_dump(str(brat_dir), None, str(tmp_path / 'mmap'), dump_format='mmap')
+    brat = load_brat_dump(path)
+    assert _summarize(brat) == _summarize(load_brat_dump(pickle_dump))
+    annot = brat.annots['doc1'][0]['T2']
+    assert annot._text is None  # read from text store
+    assert [word.word for word in annot.words] == ['chest', 'pain']
+    assert get_frequency(path) == get_frequency(pickle_dump)
+
+
+def test_sharded_and_mmap_dumps(pickle_dump, sharded_dump, brat_dir, tmp_path):
+    path = build_brat_dump(str(brat_dir), None, str(tmp_path / 'sharded'), dump_format='mmap')
+    assert path != sharded_dump
+    expected = _summarize(load_brat_dump(pickle_dump))
+    assert _summarize(load_brat_dump(path)) == expected
+    assert _summarize(load_brat_dump(sharded_dump)) == expected
+
+
+def test_sqlite_dump(pickle_dump, brat_dir, tmp_path):
+    path = build_brat_dump(str(brat_dir), None, str(tmp_path / 'sqlite'), dump_format='sqlite')
+    brat = load_brat_dump(path)
+    assert brat.doc_count == 2
+    assert _summarize(brat) == _summarize(load_brat_dump(pickle_dump))
+    assert brat.annots['doc1'][0]['T2'].attributes == {'Negated': 1}
+    assert [word.word for word in brat.annots['doc1'][0]['T2'].words] == ['chest', 'pain']
+    assert brat.get_label_counts() == {'Symptom': 4, 'Medication': 1}
+    assert brat.find_annotations(label='Medication', text='Sertraline ') == [('doc2', 'T2')]
+    for kwargs in [{}, {'normalize': False, 'once_per_document': False}, {'keep_tags': ['Symptom']},
+                   {'ignore_tags': ['Symptom']}]:
+        assert get_frequency(path, **kwargs) == get_frequency(pickle_dump, **kwargs)
+    assert get_brat_info(path) == get_brat_info(pickle_dump)
+
+
+def test_baseline_dump(pickle_dump):
+    brat = load_brat_dump(BASELINE_DUMP)
+    expected = load_brat_dump(pickle_dump)
+    assert sorted((name, annots) for name, annots, _ in _summarize(brat)) == \
+           sorted((name, annots) for name, annots, _ in _summarize(expected))
+    annot = brat.annots['doc1'][0]['T2']
+    assert annot.labels == {'Symptom': ()}
+    assert annot.attributes == {'Negated': 1}
+    assert all(annot in word.annotations for word in annot.words)
+    for sent in brat.sents['doc1']:
+        for word in sent.words:
+            assert sent.sentence[word.start - sent.start:word.end - sent.start] == word.word
+    assert get_frequency(BASELINE_DUMP) == get_frequency(pickle_dump)
+    assert sorted(get_keywords(BASELINE_DUMP)[0].term_frequencies) == \
+           sorted(get_keywords(pickle_dump)[0].term_frequencies)
+    assert get_brat_info(BASELINE_DUMP)[0] == ('Documents', 2)
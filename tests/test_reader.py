@@ -0,0 +1,92 @@
+import os
+import pickle
+from collections import defaultdict
+
+import pytest
+
+from bratdb.reader import read_brat_directory, TextFinder
+
+
+def _summarize(data):
+    return {
+        name: [
+            sorted((key, ann.text, tuple(ann.labels), ann.attributes) for key, ann in annots.items())
+            for annots, sents in entries
+        ]
+        for name, entries in data.items()
+    }
+
+
+def test_read_brat_directory(brat_dir):
+    counter = defaultdict(int)
+    data = read_brat_directory(str(brat_dir), counter=counter)
+    assert set(data) == {'doc1', 'doc2'}
+    assert counter['annfiles'] == 3
+    assert counter['no_annotations'] == 1
+    annots, sents = data['doc1'][0]
+    assert annots['T2'].attributes == {'Negated': 1}
+    assert ''.join(word.word for word in annots['T2'].words) == 'chestpain'
+
+
+def test_read_brat_directory_workers(brat_dir):
+    serial_counter = defaultdict(int)
+    serial = read_brat_directory(str(brat_dir), counter=serial_counter)
+    parallel_counter = defaultdict(int)
+    parallel = read_brat_directory(str(brat_dir), counter=parallel_counter, workers=2)
+    assert list(serial) == list(parallel)
+    assert _summarize(serial) == _summarize(parallel)
+    assert serial_counter == parallel_counter
+    pickle.dumps(parallel)
+
+
+def test_text_finder_manifest(tmp_path, monkeypatch):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    (tmp_path / 'a' / 'doc1.txt').write_text('one')
+    (tmp_path / 'b' / 'doc2.txt').write_text('two')
+    (tmp_path / 'b' / 'doc2.ann').write_text('')
+    finder = TextFinder(str(tmp_path), workers=2)
+    assert finder['doc2'] == str(tmp_path / 'b' / 'doc2.txt')
+    assert finder['doc3'] is None
+    assert (tmp_path / TextFinder.MANIFEST_NAME).exists()
+
+    with monkeypatch.context() as m:
+        m.setattr(TextFinder, '_scan', None)  # manifest should be used
+        finder = TextFinder(str(tmp_path))
+    assert len(finder) == 2
+
+    # adding a file invalidates the manifest
+    (tmp_path / 'a' / 'doc3.txt').write_text('three')
+    os.utime(tmp_path / 'a', ns=(0, 0))
+    finder = TextFinder(str(tmp_path))
+    assert finder['doc3'] == str(tmp_path / 'a' / 'doc3.txt')
+
+
+def test_text_finder_directory_symlink(tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a' / 'doc1.txt').write_text('one')
+    try:
+        os.symlink('..', tmp_path / 'a' / 'loop.txt', target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip('symlinks not supported')
+    finder = TextFinder(str(tmp_path), use_manifest=False)
+    assert len(finder) == 1
+    assert finder['doc1'] == str(tmp_path / 'a' / 'doc1.txt')
+
+
+def test_text_finder_missing(tmp_path):
+    finder = TextFinder(str(tmp_path), ignore_missing=False, use_manifest=False)
+    with pytest.raises(FileNotFoundError):
+        finder['doc1']
+
+
+def test_defer_sentences(brat_dir):
+    data = read_brat_directory(str(brat_dir), defer_sentences=True)
+    annots, document = data['doc1'][0]
+    assert not document.is_split
+    assert annots['T1'].text == 'depressed'
+    annots, document = pickle.loads(pickle.dumps((annots, document)))
+    assert [word.word for word in annots['T2'].words] == ['chest', 'pain']  # splits sentences
+    assert document.is_split
+    assert [word.word for word in annots['T1'].words] == ['depressed']
+    assert len(document) == len(read_brat_directory(str(brat_dir))['doc1'][0][1])
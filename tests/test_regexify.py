@@ -0,0 +1,49 @@
+import random
+import re
+
+import pytest
+
+from bratdb.funcs.regexify import get_required_literal, get_slop_pattern
+from bratdb.nlp.stemmer import Stemmer
+
+
+@pytest.mark.parametrize('regex, expected', [
+    (r'\bpain\b', 'pain'),
+    (Stemmer.transform('stopping'), 'stop'),  # stopp?...
+    (Stemmer.transform('medical'), 'medic'),
+    (Stemmer.transform('Nausea'), 'nausea'),
+    (r'250\.00', '250.00'),
+    (r'\d+', ''),
+])
+def test_get_required_literal(regex, expected):
+    assert get_required_literal(regex) == expected
+
+
+def legacy_slop_pattern(count, sep=r'\W'):
+    """Slop pattern previously generated by `regexify_keywords_to_file`"""
+    return rf'{sep}*(\w+{sep}*){{0,{count}}}'
+
+
+SLOP_TEXTS = [
+    'no nausea or vomiting', 'nausea, vomiting', 'nausea. vomiting', 'nausea; no vomiting',
+    'nausea and then some vomiting', 'nausea xvomiting vomits', 'nauseated vomited', 'nausea',
+    'nausea without any further vomiting today', 'vomiting and nausea', 'nausea , , vomiting',
+]
+
+
+@pytest.mark.parametrize('sep', [r'\W', r'[^\w\.;]'])
+@pytest.mark.parametrize('count', [0, 1, 2, 4])
+def test_slop_pattern_equivalent(sep, count):
+    rng = random.Random(count)
+    texts = SLOP_TEXTS + [''.join(rng.choice('aabbc  ,.;') for _ in range(rng.randint(0, 30)))
+                          for _ in range(500)]
+    firsts = [Stemmer.transform('nausea'), r'\bab\b', r'ab(s|ing|ed)?', 'a']
+    seconds = [Stemmer.transform('vomiting'), r'\bab\b', 'b', r'a\b', r'\bba', '',
+               'b' + get_slop_pattern(2, sep) + r'\bab']
+    legacy_seconds = seconds[:-1] + ['b' + legacy_slop_pattern(2, sep) + r'\bab']
+    for first in firsts:
+        for second, legacy_second in zip(seconds, legacy_seconds):
+            pat = re.compile(first + get_slop_pattern(count, sep) + second, re.I)
+            legacy = re.compile(first + legacy_slop_pattern(count, sep) + legacy_second, re.I)
+            for text in texts:
+                assert [m.span() for m in pat.finditer(text)] == [m.span() for m in legacy.finditer(text)]
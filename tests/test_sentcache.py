@@ -0,0 +1,27 @@
+from bratdb.nlp import sentcache
+from bratdb.nlp.sentcache import SentenceCache
+from bratdb.nlp.sspl import sentencebreaks_to_list
+from bratdb.reader import read_brat_directory
+
+TEXT = 'Patient reports feeling depressed. No chest pain.\nFollow up in 2 weeks (or sooner).\n\nSigned.'
+
+
+def test_sentence_cache(tmp_path, monkeypatch):
+    cache = SentenceCache(str(tmp_path))
+    assert cache.get(TEXT) is None
+    assert cache.split(TEXT) == sentencebreaks_to_list(TEXT)
+    assert cache.get(TEXT, splitter='fused') is None  # keyed by splitter
+
+    monkeypatch.setattr(sentcache, 'sentencebreaks_to_list', None)  # must not split again
+    assert SentenceCache(str(tmp_path)).split(TEXT) == sentencebreaks_to_list(TEXT)
+
+
+def test_read_brat_directory_sentence_cache(brat_dir, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    expected = read_brat_directory(str(brat_dir))
+    for _ in range(2):  # populate, then reuse
+        data = read_brat_directory(str(brat_dir), sentence_cache=str(cache_dir))
+        for name, entries in expected.items():
+            assert [[sent.sentence for sent in doc] for _, doc in data[name]] == \
+                   [[sent.sentence for sent in doc] for _, doc in entries]
+    assert len(list(cache_dir.glob('*/*'))) == 2
@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from bratdb.nlp.sspl import regex_sentence_boundary_gen, fused_sentence_boundary_gen, \
+    sentencebreaks_to_list
+
+FRAGMENTS = [
+    'The patient was seen.', 'S. cerevisiae grows', 'Anton P. Chekhov wrote', 'A. P. Chekhov', 'e.g. this',
+    'e. g. that', 'i.e. thus', 'i.v. drip', 'vs. him', 'cf. Smith', 'Dr. Who', 'Mrs. Jones', 'Fig. 3 shows',
+    'No. 5', 'approx. 10 mg', 'and then', 'or not', 'in', 'and', 'of the', 'with', '(see below.\n Next one)',
+    '[ref. 1. Ok]', 'Smith, A., Black, B.,', ', which', 'why? Because', 'word . Next', '!', '.', '?',
+    '\n', '\n\n', '  ', 'is good.', 'P.', 'gene.', 'kg(-1) .', '(a', 'b)', '[', ']', 'Mr.', 'Ms.',
+]
+SEPARATORS = [' ', '  ', '\n', '. ', '.\n', ' \n', '? ', '']
+
+
+def random_corpus(n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        text = ''.join(rng.choice(FRAGMENTS) + rng.choice(SEPARATORS) for _ in range(rng.randint(1, 30)))
+        if text.strip():
+            yield text
+
+
+@pytest.mark.parametrize('text', [
+    'Patient reports feeling depressed. No chest pain.\nFollow up in 2 weeks (or sooner).\n\nSigned.',
+    'Grown in S. cerevisiae. Observed by Anton P. Chekhov. See Fig. 2 and e. g. this.',
+    'Is it? Yes it is . Then what? Nothing.',
+    'Dose (10 mg. Twice daily.\nAs needed) given. Smith, A. ,Black, B. and others.',
+    'Single line without newline',
+])
+def test_fused_splitter_examples(text):
+    assert sentencebreaks_to_list(text, splitter='fused') == sentencebreaks_to_list(text)
+
+
+def test_fused_splitter_random_corpus():
+    for text in random_corpus(2000):
+        assert list(fused_sentence_boundary_gen(text)) == list(regex_sentence_boundary_gen(text)), text
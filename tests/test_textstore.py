@@ -0,0 +1,15 @@
+from bratdb.textstore import TextStore, TextStoreWriter, dump_data, load_data
+
+TEXTS = ['ascii text', 'naïve café', '']
+
+
+def test_text_store(tmp_path):
+    with TextStoreWriter(str(tmp_path)) as writer:
+        data = [writer.add(text) for text in TEXTS]
+        dump_data(data, str(tmp_path / 'data.pkl'), writer)
+    stored = load_data(str(tmp_path / 'data.pkl'), TextStore(str(tmp_path)))
+    for text, stored_text in zip(TEXTS, stored):
+        assert str(stored_text) == text
+        assert len(stored_text) == len(text)
+        for start, end in [(0, 5), (2, 9), (6, None), (-4, None), (5, 2)]:
+            assert stored_text[start:end] == text[start:end]
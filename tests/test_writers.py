@@ -0,0 +1,68 @@
+import gzip
+import sqlite3
+
+import pytest
+
+from bratdb.funcs.writers import get_writer, OUTPUT_FORMATS, BatchWriter
+
+COLUMNS = ('document', 'concept', 'term', 'captured')
+ROWS = [(f'doc{i}', f'c{i % 3}', f't{i % 5}', f'captured text {i}') for i in range(30)]
+
+
+def read_rows(path, output_format):
+    if output_format == 'sqlite':
+        with sqlite3.connect(path) as conn:
+            return [tuple(row) for row in conn.execute('SELECT * FROM matches ORDER BY rowid')]
+    elif output_format == 'parquet':
+        pq = pytest.importorskip('pyarrow.parquet')
+        return [tuple(row.values()) for row in pq.read_table(path).to_pylist()]
+    elif output_format == 'tsv.gz':
+        fh = gzip.open(path, 'rt', encoding='utf8')
+    elif output_format == 'tsv.zst':
+        zstandard = pytest.importorskip('zstandard')
+        fh = zstandard.open(path, 'rt', encoding='utf8')
+    else:
+        fh = open(path, encoding='utf8')
+    with fh:
+        header, *lines = fh.read().splitlines()
+    assert tuple(header.split('\t')) == COLUMNS
+    return [tuple(line.split('\t')) for line in lines]
+
+
+@pytest.mark.parametrize('output_format', list(OUTPUT_FORMATS))
+def test_writer(tmp_path, output_format):
+    if output_format == 'tsv.zst':
+        pytest.importorskip('zstandard')
+    elif output_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    path = tmp_path / f'out.{output_format}'
+    with get_writer(output_format, str(path), COLUMNS, batch_size=7) as writer:
+        for i in range(0, len(ROWS), 5):
+            writer.add(ROWS[i:i + 5])
+    assert read_rows(path, output_format) == ROWS
+
+
+@pytest.mark.parametrize('output_format', ['tsv', 'tsv.gz', 'tsv.zst', 'sqlite'])
+def test_writer_resume(tmp_path, output_format):
+    if output_format == 'tsv.zst':
+        pytest.importorskip('zstandard')
+    path = tmp_path / f'out.{output_format}'
+    with get_writer(output_format, str(path), COLUMNS, batch_size=7) as writer:
+        writer.add(ROWS[:10])
+        offset = writer.checkpoint()
+        writer.add(ROWS[10:12])  # written after checkpoint: discarded on resume
+        writer.flush()
+    with get_writer(output_format, str(path), COLUMNS, offset=offset) as writer:
+        writer.add(ROWS[10:])
+    assert read_rows(path, output_format) == ROWS
+
+
+def test_incomplete_writer(tmp_path):
+    class IncompleteWriter(BatchWriter):
+        def _open(self, offset):
+            self.out = open(self.path, 'w')
+
+    path = tmp_path / 'out.tsv'
+    with pytest.raises(TypeError):
+        IncompleteWriter(str(path), ['a'])
+    assert not path.exists()